@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Latency microbenchmark of the connector Socket.IO transports.
+
+Starts a local echo server listening on TCP and on a Unix domain socket and
+measures the round trip of small frames, similar to the response chunks the
+connector emits, for every transport. Run it from the connector virtualenv:
+
+  python benchmark_transports.py --messages 2000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import socketio
+from aiohttp import web
+
+from connector import TRANSPORTS, create_socketio_client
+
+async def start_echo_server(port, server_socket):
+  sio = socketio.AsyncServer(async_mode="aiohttp")
+  app = web.Application()
+  sio.attach(app)
+
+  @sio.on("message")
+  async def echo(sid, data):
+    return data
+
+  runner = web.AppRunner(app)
+  await runner.setup()
+  await web.TCPSite(runner, "localhost", port).start()
+  await web.UnixSite(runner, server_socket).start()
+  return runner
+
+async def benchmark_transport(transport, port, server_socket, messages):
+  client, transports = create_socketio_client(transport, server_socket)
+  server_url = "http://localhost" if transport == "unix" else f"http://localhost:{port}"
+  started_at = time.perf_counter()
+  await client.connect(server_url, transports=transports)
+  connect_time = (time.perf_counter() - started_at) * 1000
+
+  frame = {"action": "response", "finished": False, "content": "chunk of the answer "}
+  latencies = []
+  for _ in range(messages):
+    started_at = time.perf_counter()
+    await client.call("message", frame)
+    latencies.append((time.perf_counter() - started_at) * 1_000_000)
+
+  # one-way frames as emitted while streaming, acknowledged at the end
+  started_at = time.perf_counter()
+  for _ in range(messages):
+    await client.emit("message", frame)
+  await client.call("message", frame)
+  throughput = messages / (time.perf_counter() - started_at)
+
+  await client.disconnect()
+  latencies.sort()
+  return {
+    "connect": connect_time,
+    "p50": statistics.median(latencies),
+    "p95": latencies[int(len(latencies) * 0.95) - 1],
+    "mean": statistics.mean(latencies),
+    "throughput": throughput,
+  }
+
+async def run(messages, port):
+  server_socket = os.path.join(tempfile.mkdtemp(), "benchmark.sock")
+  runner = await start_echo_server(port, server_socket)
+  try:
+    print(f"{'transport':<10} {'connect ms':>10} {'p50 us':>10} {'p95 us':>10} {'mean us':>10} {'frames/s':>10}")
+    for transport in TRANSPORTS:
+      result = await benchmark_transport(transport, port, server_socket, messages)
+      print(f"{transport:<10} {result['connect']:>10.1f} {result['p50']:>10.0f} {result['p95']:>10.0f} {result['mean']:>10.0f} {result['throughput']:>10.0f}")
+  finally:
+    await runner.cleanup()
+    os.remove(server_socket)
+
+def main():
+  parser = argparse.ArgumentParser(description="AiderDesk connector transport benchmark")
+  parser.add_argument("--messages", type=int, default=1000, help="Number of frames per transport")
+  parser.add_argument("--port", type=int, default=24399, help="TCP port of the echo server")
+  args = parser.parse_args()
+
+  asyncio.run(run(args.messages, args.port))
+
+if __name__ == "__main__":
+  main()
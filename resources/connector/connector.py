@@ -1,26 +1,378 @@
 #!/usr/bin/env python
 
 import argparse
+import atexit
+import bisect
+import codecs
+import copy
+import cProfile
 import os
+import pstats
+import platform
+import re
+import subprocess
 import sys
 import asyncio
 import json
+import multiprocessing
+import hashlib
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import tracemalloc
+import aiohttp
+import psutil
 import socketio
+import aider.commands
 from aider import models
-from aider.coders import Coder
+from aider.coders import Coder, base_coder
+from aider.coders.editblock_coder import do_replace, find_filename, strip_filename, strip_quoted_wrapping, HEAD, DIVIDER, UPDATED
+from aider.history import ChatSummary
 from aider.io import InputOutput, AutoCompleter
 from aider.watch import FileWatcher
 from aider.main import main as cli_main
+from aider.run_cmd import get_windows_parent_process_name
 from aider.utils import is_image_file
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from io import StringIO
+from types import SimpleNamespace
+from uuid import uuid4
 import nest_asyncio
 nest_asyncio.apply()
 
 confirmation_result = None
-whole_content = ""
+
+class ResponseBuffer:
+  """Accumulates streamed response chunks, keeping at most max_size characters."""
+
+  TRUNCATED_MARKER = "\n\n... (response truncated)"
+
+  def __init__(self, max_size=None):
+    self.max_size = max_size
+    self.chunks = []
+    self.size = 0
+    self.truncated = False
+
+  def __bool__(self):
+    return self.size > 0
+
+  def append(self, chunk):
+    if not chunk or self.truncated:
+      return
+    if self.max_size is not None and self.size + len(chunk) > self.max_size:
+      chunk = chunk[:self.max_size - self.size]
+      self.truncated = True
+    if chunk:
+      self.chunks.append(chunk)
+      self.size += len(chunk)
+
+  def getvalue(self):
+    if len(self.chunks) > 1:
+      self.chunks = ["".join(self.chunks)]
+    content = self.chunks[0] if self.chunks else ""
+    return content + self.TRUNCATED_MARKER if self.truncated else content
+
+  def clear(self):
+    self.chunks = []
+    self.size = 0
+    self.truncated = False
+
+class ReplayBuffer:
+  """Sent messages kept for replay after a reconnect, at most max_size characters of their text."""
+
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self.messages = deque()
+    self.size = 0
+    # newest seq of the messages dropped to stay in max_size, those can not be replayed anymore
+    self.dropped_seq = 0
+
+  def __iter__(self):
+    return ((event, data) for event, data, _size in self.messages)
+
+  def append(self, event, data):
+    # only the text is counted, the rest of a message is small
+    size = sum(len(value) for value in data.values() if isinstance(value, str))
+    if size > self.max_size:
+      self.dropped_seq = data['seq']
+      return
+    self.messages.append((event, data, size))
+    self.size += size
+    while self.size > self.max_size:
+      _event, dropped, dropped_size = self.messages.popleft()
+      self.size -= dropped_size
+      self.dropped_seq = dropped['seq']
+
+class CommandOutputStream(ResponseBuffer):
+  """Output of a shell command sent in batched command-output messages, capped at max_size characters."""
+
+  TRUNCATED_MARKER = "\n\n... (output truncated)"
+  # every ACK_INTERVAL-th batch waits for the server to acknowledge it, bounding the batches in flight
+  ACK_INTERVAL = 4
+  ACK_TIMEOUT = 30
+
+  def __init__(self, connector, command, max_size=None, batch_size=65536):
+    super().__init__(max_size)
+    self.connector = connector
+    self.command = command
+    self.command_id = uuid4().hex
+    self.batch_size = batch_size
+    self.pending = []
+    self.pending_size = 0
+    self.sent_batches = 0
+    self.finished = False
+
+  def write(self, text):
+    if self.truncated or self.finished:
+      return
+    size = self.size
+    self.append(text)
+    if self.size > size:
+      self.pending.append(text[:self.size - size])
+      self.pending_size += self.size - size
+    if self.truncated:
+      self.pending.append(self.TRUNCATED_MARKER)
+      self.flush()
+    elif self.pending_size >= self.batch_size:
+      self.flush()
+
+  def flush(self):
+    if not self.pending:
+      return
+    output = "".join(self.pending)
+    self.pending = []
+    self.pending_size = 0
+    self.sent_batches += 1
+    self.send({"output": output, "finished": False}, self.sent_batches % self.ACK_INTERVAL == 0)
+
+  def finish(self, exit_code):
+    if self.finished:
+      return
+    self.flush()
+    self.finished = True
+    self.send({"output": "", "finished": True, "exitCode": exit_code, "truncated": self.truncated})
+
+  def send(self, data, ack=False):
+    # emit only queues the packet, waiting for an ack makes the command wait on its full pipe meanwhile
+    wait_for_async(self.connector, self.connector.emit('message', {
+      "action": "command-output",
+      "commandId": self.command_id,
+      "command": self.command,
+      **data
+    }, ack_timeout=self.ACK_TIMEOUT if ack else None))
+
+TRANSPORTS = ["polling", "websocket", "unix"]
+
+def create_socketio_client(transport="polling", server_socket=None):
+  """Create the Socket.IO client and the engine.io transports to connect with, must be called from a coroutine."""
+  if transport == "unix":
+    # requests go through the Unix domain socket, the host in the url is not used
+    http_session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=server_socket))
+    return socketio.AsyncClient(http_session=http_session), ["websocket"]
+  if transport == "websocket":
+    # skip the long-polling handshake
+    return socketio.AsyncClient(), ["websocket"]
+  return socketio.AsyncClient(), None
+
+def format_size(size):
+  for unit in ["B", "KB", "MB"]:
+    if size < 1024:
+      return f"{size:.1f} {unit}"
+    size /= 1024
+  return f"{size:.1f} GB"
+
+class Profiler:
+  """Deterministic profiler of the connector actions, only the main thread is profiled."""
+
+  def __init__(self, output_dir=None):
+    self.output_dir = output_dir or tempfile.gettempdir()
+    self.profile = None
+    self.active_actions = 0
+
+  @property
+  def running(self):
+    return self.profile is not None
+
+  def start(self):
+    if self.profile:
+      return
+    self.profile = cProfile.Profile()
+    if self.active_actions:
+      self.profile.enable()
+
+  def stop(self, top=20):
+    """Stop profiling, returns the path of the pstats file and the top functions by cumulative time."""
+    profile = self.profile
+    self.profile = None
+    if not profile:
+      return None, None
+    if self.active_actions:
+      profile.disable()
+
+    os.makedirs(self.output_dir, exist_ok=True)
+    path = os.path.join(self.output_dir, f"aider-desk-connector-{time.strftime('%Y%m%d-%H%M%S')}.pstats")
+    profile.dump_stats(path)
+    if not profile.stats:
+      return path, "No actions were profiled."
+
+    stream = StringIO()
+    pstats.Stats(profile, stream=stream).strip_dirs().sort_stats("cumulative").print_stats(top)
+    return path, stream.getvalue().strip()
+
+  @contextmanager
+  def profiled(self):
+    self.active_actions += 1
+    if self.active_actions == 1 and self.profile:
+      self.profile.enable()
+    try:
+      yield
+    finally:
+      self.active_actions -= 1
+      if self.active_actions == 0 and self.profile:
+        self.profile.disable()
+
+class FileListing:
+  """Snapshot of the repository file listing, reused until the git index, HEAD or ignore files change."""
+
+  def __init__(self):
+    self.key = None
+    self.relative_files = []
+    self.abs_files = []
+    self.hits = 0
+    self.misses = 0
+    # used from the loop and the background executors
+    self.lock = threading.Lock()
+
+  def get_key(self, coder):
+    repo = coder.repo
+    if not repo:
+      return None
+    try:
+      git_repo = repo.repo
+      head = git_repo.head.commit.hexsha if git_repo.head.is_valid() else None
+      paths = [os.path.join(git_repo.git_dir, "index"), os.path.join(coder.root, ".gitignore"), repo.aider_ignore_file]
+    except Exception:
+      return None
+
+    key = [coder.root, head]
+    for path in paths:
+      try:
+        stat = os.stat(path)
+        key.append((stat.st_mtime_ns, stat.st_size))
+      except (OSError, TypeError):
+        key.append(None)
+    return tuple(key)
+
+  def refresh(self, coder):
+    """Returns the relative and absolute file lists, enumerated again when the key changed."""
+    key = self.get_key(coder)
+    with self.lock:
+      if key is not None and key == self.key:
+        self.hits += 1
+        return self.relative_files, self.abs_files
+      self.misses += 1
+
+    # the key is only stored with the lists, a failed enumeration is not cached
+    relative_files = coder.get_all_relative_files()
+    abs_files = [coder.abs_root_path(path) for path in relative_files]
+    with self.lock:
+      self.key = key
+      self.relative_files = relative_files
+      self.abs_files = abs_files
+    return relative_files, abs_files
+
+  def get_relative_files(self, coder):
+    return self.refresh(coder)[0]
+
+  def get_abs_files(self, coder):
+    return self.refresh(coder)[1]
+
+  def get_addable_relative_files(self, coder):
+    inchat_files = set(coder.get_inchat_relative_files())
+    read_only_files = set(coder.get_rel_fname(fname) for fname in coder.abs_read_only_fnames)
+    return set(self.get_relative_files(coder)) - inchat_files - read_only_files
+
+def get_trigrams(text):
+  return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class ModelIndex:
+  """Prefix and trigram search index over the model names known to aider."""
+
+  def __init__(self, names):
+    self.names = sorted(set(names))
+    self.version = hashlib.sha1("\n".join(self.names).encode()).hexdigest()
+    self.lower_names = [name.lower() for name in self.names]
+
+    # names are also searchable without their provider prefix
+    prefix_keys = []
+    for i, name in enumerate(self.lower_names):
+      prefix_keys.append((name, i))
+      if "/" in name:
+        prefix_keys.append((name.rsplit("/", 1)[1], i))
+    self.prefix_keys = sorted(prefix_keys)
+
+    self.trigrams = {}
+    for i, name in enumerate(self.lower_names):
+      for trigram in get_trigrams(name):
+        self.trigrams.setdefault(trigram, set()).add(i)
+
+  def search(self, query, limit=20):
+    """Returns the names ranked by exact, prefix, substring and then trigram similarity matches."""
+    query = query.strip().lower()
+    if not query:
+      return self.names[:limit]
+
+    ranks = {}
+    start = bisect.bisect_left(self.prefix_keys, (query, -1))
+    for key, i in self.prefix_keys[start:]:
+      if not key.startswith(query):
+        break
+      ranks[i] = min(ranks.get(i, 1), 0 if key == query else 1)
+
+    query_trigrams = get_trigrams(query)
+    if query_trigrams:
+      shared = {}
+      for trigram in query_trigrams:
+        for i in self.trigrams.get(trigram, ()):
+          shared[i] = shared.get(i, 0) + 1
+      candidates = {i: count / len(query_trigrams) for i, count in shared.items()}
+    else:
+      # too short for trigrams
+      candidates = {i: 0 for i, name in enumerate(self.lower_names) if query in name}
+
+    results = []
+    for i, similarity in candidates.items():
+      if i in ranks:
+        rank = ranks.pop(i)
+      elif query in self.lower_names[i]:
+        rank = 2
+      elif similarity >= 0.5:
+        rank = 3
+      else:
+        continue
+      results.append((rank, -similarity, len(self.names[i]), self.names[i]))
+    results += [(rank, 0, len(self.names[i]), self.names[i]) for i, rank in ranks.items()]
+
+    return [name for *_, name in sorted(results)[:limit]]
+
+model_index = None
+
+def get_model_index():
+  global model_index
+  if model_index is None:
+    model_index = ModelIndex(models.fuzzy_match_models("") + [model_settings.name for model_settings in models.MODEL_SETTINGS])
+  return model_index
 
 def wait_for_async(connector, coroutine):
   try:
+    if threading.current_thread() is not threading.main_thread():
+      # called from a worker thread, the loop is running in the main thread
+      return asyncio.run_coroutine_threadsafe(coroutine, connector.loop).result()
     task = connector.loop.create_task(coroutine)
     result = connector.loop.run_until_complete(task)
     return result
@@ -28,7 +380,31 @@ def wait_for_async(connector, coroutine):
     connector.coder.io.tool_output(f'EXCEPTION: {e}')
     return None
 
-async def run_editor_coder_stream(architect_coder, connector):
+def report_stream_usage(coder):
+  """Let aider account the usage sent at the end of the stream, it includes the cache read/write tokens."""
+  # a copy, the model object is shared with the architect
+  coder.main_model = copy.copy(coder.main_model)
+  coder.main_model.extra_params = {**(coder.main_model.extra_params or {}), "stream_options": {"include_usage": True}}
+  stream_usage = {}
+
+  def with_usage(completion):
+    for chunk in completion:
+      if getattr(chunk, "usage", None):
+        stream_usage["usage"] = chunk.usage
+      yield chunk
+
+  show_send_output_stream = coder.show_send_output_stream
+  coder.show_send_output_stream = lambda completion: show_send_output_stream(with_usage(completion))
+
+  calculate_and_show_tokens_and_cost = coder.calculate_and_show_tokens_and_cost
+  def calculate_with_stream_usage(messages, completion=None):
+    usage = stream_usage.pop("usage", None)
+    if usage and not getattr(completion, "usage", None):
+      completion = SimpleNamespace(usage=usage)
+    return calculate_and_show_tokens_and_cost(messages, completion)
+  coder.calculate_and_show_tokens_and_cost = calculate_with_stream_usage
+
+def create_editor_coder(architect_coder, cache_prompts=False):
   # Use the editor_model from the main_model if it exists, otherwise use the main_model itself
   editor_model = architect_coder.main_model.editor_model or architect_coder.main_model
 
@@ -38,7 +414,8 @@ async def run_editor_coder_stream(architect_coder, connector):
   kwargs["suggest_shell_commands"] = False
   kwargs["map_tokens"] = 0
   kwargs["total_cost"] = architect_coder.total_cost
-  kwargs["cache_prompts"] = False
+  # the editor prefix (system prompt, read-only and chat files) repeats between editor passes
+  kwargs["cache_prompts"] = cache_prompts
   kwargs["num_cache_warming_pings"] = 0
   kwargs["summarize_from_coder"] = False
 
@@ -48,33 +425,268 @@ async def run_editor_coder_stream(architect_coder, connector):
   editor_coder = Coder.create(**new_kwargs)
   editor_coder.cur_messages = []
   editor_coder.done_messages = []
+  if cache_prompts:
+    report_stream_usage(editor_coder)
+  return editor_coder
+
+def prepare_editor_coder(architect_coder, cache_prompts=False):
+  editor_coder = create_editor_coder(architect_coder, cache_prompts)
+  # Build the prompt prefix (system prompt, files) once to warm up file reads and tokenizers
+  editor_coder.format_chat_chunks()
+  return editor_coder
+
+# edit formats with blocks the structured stream can follow
+EDIT_BLOCK_FORMATS = {
+  "diff": "editblock",
+  "diff-fenced": "editblock",
+  "editor-diff": "editblock",
+  "editor-diff-fenced": "editblock",
+  "whole": "whole",
+  "editor-whole": "whole",
+  "udiff": "udiff",
+  "udiff-simple": "udiff",
+}
+
+class EditBlockStreamParser:
+  """Incremental parser of the edit blocks in a streamed answer, every line is scanned only once."""
+
+  def __init__(self, edit_format, fence, valid_fnames):
+    self.format = edit_format
+    self.fence = fence
+    self.valid_fnames = valid_fnames
+    self.partial_line = ""
+    self.previous_lines = deque(maxlen=3)
+    self.pending_line = None
+    self.block = None
+    self.block_count = 0
+    self.last_path = None
+
+  @classmethod
+  def for_coder(cls, coder):
+    edit_format = EDIT_BLOCK_FORMATS.get(coder.edit_format)
+    if not edit_format:
+      return None
+    return cls(edit_format, coder.fence, coder.get_inchat_relative_files())
+
+  def feed(self, chunk):
+    """Returns the edit block events of the lines completed by the chunk."""
+    lines = (self.partial_line + chunk).split("\n")
+    self.partial_line = lines.pop()
+    events = []
+    for line in lines:
+      self.process_line(line + "\n", events)
+    return events
+
+  def finish(self):
+    """Returns the events of the rest of the answer, an unterminated block is ended as incomplete."""
+    events = []
+    if self.partial_line:
+      self.process_line(self.partial_line, events)
+      self.partial_line = ""
+    if self.pending_line:
+      self.add_delta(events, self.pending_line)
+      self.pending_line = None
+    if self.block:
+      self.end_block(events, complete=False)
+    return events
+
+  def start_block(self, events, path, section):
+    self.block_count += 1
+    self.block = {"id": self.block_count, "path": path, "section": section}
+    self.last_path = path
+    events.append({
+      "action": "edit-block-start",
+      "blockId": self.block_count,
+      "path": path,
+      "format": self.format,
+    })
 
-  global whole_content
-  if not whole_content:
-    whole_content = architect_coder.partial_response_content
+  def add_delta(self, events, content):
+    last = events[-1] if events else None
+    if last and last["action"] == "edit-block-delta" and last["blockId"] == self.block["id"] and last["section"] == self.block["section"]:
+      last["content"] += content
+      return
+    events.append({
+      "action": "edit-block-delta",
+      "blockId": self.block["id"],
+      "section": self.block["section"],
+      "content": content,
+    })
 
-  await connector.sio.emit('message', {
+  def end_block(self, events, complete=True):
+    events.append({
+      "action": "edit-block-end",
+      "blockId": self.block["id"],
+      "path": self.block["path"],
+      "complete": complete,
+    })
+    self.block = None
+    self.previous_lines.clear()
+
+  def process_line(self, line, events):
+    if self.format == "editblock":
+      self.process_editblock_line(line, events)
+    elif self.format == "whole":
+      self.process_whole_line(line, events)
+    else:
+      self.process_udiff_line(line, events)
+
+  def process_editblock_line(self, line, events):
+    stripped = line.strip()
+    if not self.block:
+      if re.match(HEAD, stripped):
+        path = find_filename(list(self.previous_lines), self.fence, self.valid_fnames) or self.last_path
+        self.start_block(events, path, "search")
+      else:
+        self.previous_lines.append(line)
+    elif self.block["section"] == "search" and re.match(DIVIDER, stripped):
+      self.block["section"] = "replace"
+    elif self.block["section"] == "replace" and re.match(UPDATED, stripped):
+      self.end_block(events)
+    else:
+      self.add_delta(events, line)
+
+  def process_whole_line(self, line, events):
+    if not self.block:
+      if line.startswith(self.fence[0]) and self.previous_lines:
+        path = strip_filename(self.previous_lines[-1], self.fence)
+        if not path and len(self.valid_fnames) == 1:
+          path = self.valid_fnames[0]
+        if path:
+          self.start_block(events, path, "content")
+          return
+      self.previous_lines.append(line)
+    elif line.rstrip() == self.fence[1]:
+      self.end_block(events)
+    else:
+      self.add_delta(events, line)
+
+  def process_udiff_line(self, line, events):
+    if self.pending_line:
+      pending_line = self.pending_line
+      self.pending_line = None
+      if line.startswith("+++ "):
+        self.end_block(events)
+      else:
+        self.add_delta(events, pending_line)
+
+    if not self.block:
+      if line.startswith("+++ "):
+        path = line[4:].strip()
+        if path.startswith("b/") and path[2:] in self.valid_fnames:
+          path = path[2:]
+        self.start_block(events, path, "hunk")
+    elif line.startswith("--- "):
+      # either a removed line or the header of the next file
+      self.pending_line = line
+    elif line.startswith(self.fence[1]) and not line.startswith(self.fence[1] + "diff"):
+      self.end_block(events)
+    else:
+      self.add_delta(events, line)
+
+async def run_editor_coder_stream(architect_coder, connector):
+  started_at = time.monotonic()
+  editor_coder = await connector.get_editor_coder(architect_coder)
+
+  response_buffer = connector.response_buffer
+  if not response_buffer:
+    response_buffer.append(architect_coder.partial_response_content)
+
+  await connector.emit('message', {
     "action": "response",
     "finished": True,
-    "content": whole_content
+    "content": response_buffer.getvalue(),
+    "usageReport": architect_coder.usage_report
   })
 
-  whole_content = ""
+  response_buffer.clear()
+  edit_block_parser = EditBlockStreamParser.for_coder(editor_coder) if connector.structured_stream else None
   # run the editor coder
   for chunk in editor_coder.run_stream(architect_coder.partial_response_content):
-    # add small sleeps here to allow other coroutines to run
-    await connector.sio.emit('message', {
+    if connector.editor_latency is None:
+      connector.report_editor_latency(started_at)
+    await connector.emit('message', {
       "action": "response",
       "finished": False,
       "content": chunk
     })
-    whole_content += chunk
-    await asyncio.sleep(0.01)
+    response_buffer.append(chunk)
+    if edit_block_parser:
+      await connector.send_edit_block_events(edit_block_parser.feed(chunk))
+    # yield to allow other coroutines to run
+    await asyncio.sleep(0)
+  if edit_block_parser:
+    await connector.send_edit_block_events(edit_block_parser.finish())
 
   # set values back to the architect coder
   architect_coder.move_back_cur_messages("I made those changes to the files.")
   architect_coder.total_cost = editor_coder.total_cost
   architect_coder.aider_commit_hashes = editor_coder.aider_commit_hashes
+  architect_coder.aider_edited_files = editor_coder.aider_edited_files
+  # the final response reports the editor usage, including its cache tokens
+  architect_coder.usage_report = editor_coder.usage_report
+
+def read_file_to_edit(io, full_path):
+  """Content of a file to edit, None when it does not exist yet."""
+  if not os.path.exists(full_path):
+    return None
+  content = io.read_text(full_path, silent=True)
+  if content is None:
+    raise ValueError("file could not be read")
+  return content
+
+def replace_file_edits(full_path, content, file_edits, fence):
+  """Apply the search/replace edits of one file to its content (None for a new file), returns the new content."""
+  new_content = content
+  for original, updated in file_edits:
+    if not original.strip():
+      # append or start a new file, do_replace would create the file on disk right away
+      new_content = (new_content or "") + strip_quoted_wrapping(updated, full_path, fence)
+      continue
+    if new_content is None:
+      raise ValueError("file not found")
+
+    replaced_content = do_replace(full_path, new_content, original, updated, fence)
+    if not replaced_content:
+      raise ValueError("SEARCH block did not match the file content")
+    new_content = replaced_content
+
+  return new_content
+
+def write_files_atomically(files, encoding, newline=None):
+  """Write all files through temp files renamed in place, restores the original files when any write fails."""
+  temp_files = []
+  try:
+    for full_path, _original_content, new_content in files:
+      directory = os.path.dirname(full_path)
+      os.makedirs(directory, exist_ok=True)
+      fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".aider-desk-", suffix=".tmp")
+      temp_files.append(temp_path)
+      with os.fdopen(fd, "w", encoding=encoding, newline=newline) as f:
+        f.write(new_content)
+      if os.path.exists(full_path):
+        shutil.copymode(full_path, temp_path)
+  except Exception:
+    for temp_path in temp_files:
+      os.remove(temp_path)
+    raise
+
+  replaced = []
+  try:
+    for temp_path, (full_path, original_content, _new_content) in zip(temp_files, files):
+      os.replace(temp_path, full_path)
+      replaced.append((full_path, original_content))
+  except Exception:
+    for full_path, original_content in replaced:
+      if original_content is None:
+        os.remove(full_path)
+      else:
+        with open(full_path, "w", encoding=encoding, newline=newline) as f:
+          f.write(original_content)
+    for temp_path in temp_files[len(replaced):]:
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+    raise
 
 class ConnectorInputOutput(InputOutput):
   def __init__(self, connector=None, **kwargs):
@@ -83,6 +695,7 @@ class ConnectorInputOutput(InputOutput):
     self.running_shell_command = False
     self.processing_loading_message = False
     self.current_command = None
+    self.command_output = None
 
   def add_to_input_history(self, input_text):
     # handled by AiderDesk
@@ -94,15 +707,10 @@ class ConnectorInputOutput(InputOutput):
       for message in messages:
         # Extract current command from "Running" messages
         if message.startswith("Running ") and not self.current_command:
-          async def send_use_command_output():
-            await self.connector.send_action({
-              "action": "use-command-output",
-              "command": self.current_command,
-            })
-            await asyncio.sleep(0.1)
-
-          self.current_command = message[8:]
-          wait_for_async(self.connector, send_use_command_output())
+          self.open_command_output(message[8:])
+        elif self.command_output is not None:
+          # output of commands like /tokens printed while the command block is open
+          self.command_output.write(f"{message}\n")
     else:
       for message in messages:
         if message.startswith("Commit "):
@@ -151,7 +759,7 @@ class ConnectorInputOutput(InputOutput):
 
     # Create coroutine for emitting the question
     async def ask_question():
-      await self.connector.sio.emit('message', {
+      await self.connector.emit('message', {
         'action': 'ask-question',
         'question': question,
         'subject': subject,
@@ -161,9 +769,19 @@ class ConnectorInputOutput(InputOutput):
         await asyncio.sleep(1)
       return confirmation_result
 
-    result = wait_for_async(self.connector, ask_question())
+    architect_edit = self.connector.running_coder and question == "Edit the files?"
+    if architect_edit:
+      self.connector.architect_finished_at = time.monotonic()
 
-    if result == "y" and self.connector.running_coder and question == "Edit the files?":
+    if self.connector.headless:
+      # nobody to ask, answer the same way as --yes-always
+      result = "n" if explicit_yes_required else "y"
+    elif architect_edit and self.connector.pipelined_architect_auto_accept:
+      result = "y"
+    else:
+      result = wait_for_async(self.connector, ask_question())
+
+    if result == "y" and architect_edit:
       # Process architect coder
       wait_for_async(self.connector, run_editor_coder_stream(self.connector.running_coder, self.connector))
       return False
@@ -176,16 +794,39 @@ class ConnectorInputOutput(InputOutput):
 
     return result == "y"
 
+  def open_command_output(self, command):
+    async def send_use_command_output():
+      await self.connector.send_action({
+        "action": "use-command-output",
+        "command": command,
+        "commandId": self.command_output.command_id,
+      })
+      await asyncio.sleep(0.1)
+
+    self.current_command = command
+    self.command_output = CommandOutputStream(self.connector, command, self.connector.max_command_output)
+    wait_for_async(self.connector, send_use_command_output())
+
+  def get_command_output(self, command):
+    """The output stream of the open command block, or a new one when there is none."""
+    if self.command_output is not None and not self.command_output.finished:
+      return self.command_output
+    return CommandOutputStream(self.connector, command, self.connector.max_command_output)
+
   def reset_state(self):
     if (self.current_command):
+      if self.command_output is not None:
+        self.command_output.finish(0)
       wait_for_async(self.connector, self.connector.send_action({
         "action": "use-command-output",
         "command": self.current_command,
+        "commandId": self.command_output.command_id if self.command_output is not None else None,
         "finished": True
       }))
 
       self.running_shell_command = False
       self.current_command = None
+      self.command_output = None
 
   def interrupt_input(self):
     async def process_changes():
@@ -201,6 +842,25 @@ class ConnectorInputOutput(InputOutput):
         wait_for_async(self.connector, self.connector.send_log_message("loading", "Processing request..."))
         self.connector.loop.create_task(process_changes())
 
+REPO_MAP_LOCKS_LOCK = threading.Lock()
+
+def get_repo_map_lock(repo_map):
+  """Lock of a RepoMap, its caches are filled both by the prompts on the loop and by the refresh on the repo map executor."""
+  with REPO_MAP_LOCKS_LOCK:
+    lock = getattr(repo_map, "connector_lock", None)
+    if lock is None:
+      lock = repo_map.connector_lock = threading.Lock()
+    return lock
+
+aider_get_repo_map = Coder.get_repo_map
+
+def get_coder_repo_map(coder, force_refresh=False):
+  """Replacement of Coder.get_repo_map waiting for a repo map being built by the refresh instead of racing it."""
+  if not coder.repo_map:
+    return None
+  with get_repo_map_lock(coder.repo_map):
+    return aider_get_repo_map(coder, force_refresh)
+
 def create_coder(connector):
   coder = cli_main(return_coder=True)
   if not isinstance(coder, Coder):
@@ -238,12 +898,58 @@ def create_coder(connector):
 
   return coder
 
+# number of files from which the edits of an apply-edits batch are matched in worker processes
+PARALLEL_EDITS_MIN_FILES = 16
+PARALLEL_EDITS_FILES_PER_WORKER = 8
+
+def create_edits_executor(file_count):
+  """Worker processes matching the edits of one batch, at most one per PARALLEL_EDITS_FILES_PER_WORKER files."""
+  max_workers = max(1, min(8, os.cpu_count() or 1, file_count // PARALLEL_EDITS_FILES_PER_WORKER))
+  # spawn, forking the connector threads and sockets is not safe
+  return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+# actions carrying a state category, compared by hash when a session is resumed
+STATE_ACTIONS = {
+  'update-context-files',
+  'set-models',
+  'update-repo-map',
+  'update-autocompletion',
+  'tokens-info',
+}
+
 class Connector:
-  def __init__(self, base_dir, watch_files=False, server_url="http://localhost:24337", reasoning_effort=None, thinking_tokens=None):
+  def __init__(self, base_dir, watch_files=False, server_url="http://localhost:24337", transport="polling", server_socket=None, reasoning_effort=None, thinking_tokens=None, summarize_threshold=0.5, pipelined_architect=False, pipelined_architect_auto_accept=False, max_response_size=None, replay_buffer_size=8_000_000, profiler=None, headless=False, structured_stream=False, max_command_output=None, editor_cache_prompts=False):
     self.base_dir = base_dir
     self.server_url = server_url
+    self.transport = transport
+    self.server_socket = server_socket
     self.reasoning_effort = reasoning_effort
     self.thinking_tokens = thinking_tokens
+    self.summarize_threshold = summarize_threshold
+    self.pipelined_architect = pipelined_architect or pipelined_architect_auto_accept
+    self.pipelined_architect_auto_accept = pipelined_architect_auto_accept
+    self.max_response_size = max_response_size
+    self.profiler = profiler or Profiler()
+    self.headless = headless
+    self.structured_stream = structured_stream
+    self.max_command_output = max_command_output
+    self.editor_cache_prompts = editor_cache_prompts
+
+    try:
+      self.loop = asyncio.get_event_loop()
+    except RuntimeError:
+      self.loop = asyncio.new_event_loop()
+      asyncio.set_event_loop(self.loop)
+
+    Coder.get_repo_map = get_coder_repo_map
+
+    self.summarization_future = None
+    self.summarization_executor = None
+    self.pending_summary = None
+    if summarize_threshold:
+      # aider joins its summarizer thread when the next prompt is formatted, summaries are swapped in only once done instead
+      Coder.summarize_start = lambda coder: self.summarize_start(coder)
+      Coder.summarize_end = lambda coder: self.summarize_end(coder)
 
     self.coder = create_coder(self)
     if reasoning_effort is not None:
@@ -251,6 +957,10 @@ class Connector:
     if thinking_tokens is not None:
       self.coder.main_model.set_thinking_tokens(thinking_tokens)
 
+    # shell commands stream their output over the socket instead of printing it
+    aider.commands.run_cmd = self.run_shell_command
+    base_coder.run_cmd = self.run_shell_command
+
     self.coder.yield_stream = True
     self.coder.stream = True
     self.coder.pretty = False
@@ -258,6 +968,15 @@ class Connector:
     self.interrupted = False
     self.current_tokenization_future = None
     self.tokenization_executor = None
+    self.repo_map_executor = None
+    self.editor_coder_future = None
+    self.architect_finished_at = None
+    self.editor_latency = None
+    self.file_tokens_cache = {}
+    self.file_listing = FileListing()
+    self.sent_models_version = None
+    self.refresh_task = None
+    self.response_buffer = ResponseBuffer(max_response_size)
 
     if watch_files:
       ignores = []
@@ -269,20 +988,31 @@ class Connector:
       self.file_watcher = FileWatcher(self.coder, gitignores=ignores)
       self.file_watcher.start()
 
-    try:
-      self.loop = asyncio.get_event_loop()
-    except RuntimeError:
-      self.loop = asyncio.new_event_loop()
-      asyncio.set_event_loop(self.loop)
-
-    self.sio = socketio.AsyncClient()
-    self._register_events()
+    # created in connect, the client of the unix transport needs a running loop
+    self.sio = None
+    self.session_id = None
+    self.outbound_seq = 0
+    self.outbound_buffer = ReplayBuffer(replay_buffer_size)
+    # set from a disconnect until the replay is done, newer messages must not overtake the replayed ones
+    self.resuming = False
+    self.state_hashes = {}
 
   def get_tokenization_executor(self):
     if self.tokenization_executor is None:
       self.tokenization_executor = ThreadPoolExecutor(max_workers=2)
     return self.tokenization_executor
 
+  def get_repo_map_executor(self):
+    # a single worker, RepoMap and GitPython are not safe to use from several threads
+    if self.repo_map_executor is None:
+      self.repo_map_executor = ThreadPoolExecutor(max_workers=1)
+    return self.repo_map_executor
+
+  def get_summarization_executor(self):
+    if self.summarization_executor is None:
+      self.summarization_executor = ThreadPoolExecutor(max_workers=1)
+    return self.summarization_executor
+
   def _register_events(self):
     @self.sio.event
     async def connect():
@@ -292,6 +1022,10 @@ class Connector:
     async def on_message(data):
       await self.on_message(data)
 
+    @self.sio.on("resume-session")
+    async def on_resume_session(data):
+      await self.on_resume_session(data)
+
     @self.sio.event
     async def disconnect():
       await self.on_disconnect()
@@ -299,9 +1033,16 @@ class Connector:
   async def on_connect(self):
     """Handle connection event."""
     self.coder.io.tool_output("CONNECTED TO SERVER")
-    await self.send_action({
+    resume = self.session_id is not None
+    if not resume:
+      self.session_id = uuid4().hex
+
+    # init is not sequenced, it must never be replayed
+    await self.sio.emit('message', {
       'action': 'init',
       'baseDir': self.base_dir,
+      'sessionId': self.session_id,
+      'resume': resume,
       'listenTo': [
         'prompt',
         'add-file',
@@ -312,27 +1053,105 @@ class Connector:
         'run-command',
         'add-message',
         'interrupt-response',
-        'apply-edits'
+        'apply-edits',
+        'memory-telemetry',
+        'profile',
+        'search-models'
       ],
       'inputHistoryFile': self.coder.io.input_history_file
     })
+    await asyncio.sleep(0.01)
+    if not resume:
+      await self.send_state()
+
+  async def send_state(self):
     await self.send_update_context_files()
     await self.send_current_models()
     await self.send_repo_map()
     await self.send_autocompletion()
 
-  async def _send_tokenized_autocompletion(self, tokenized_words, initial_words, all_relative_files, all_models):
+  async def on_resume_session(self, data):
+    """Replay messages the server has not received and resend the state that differs."""
+    last_seq = data.get('lastSeq')
+    if last_seq is None:
+      # server does not know this session anymore
+      self.resuming = False
+      self.sent_models_version = None
+      await self.send_state()
+      return
+
+    # messages the server missed were pushed out of the buffer, the rest is replayed but the state is sent whole
+    lost_seq = self.outbound_buffer.dropped_seq if self.outbound_buffer.dropped_seq > last_seq else None
+    server_last_seq = last_seq
+
+    replayed = 0
+    while True:
+      # messages emitted meanwhile are buffered and replayed in the next round
+      messages = [(event, message) for event, message in self.outbound_buffer if message['seq'] > last_seq]
+      if not messages:
+        break
+      for event, message in messages:
+        await self.sio.emit(event, message)
+        last_seq = message['seq']
+        replayed += 1
+    self.resuming = False
+
+    if lost_seq is not None:
+      self.coder.io.tool_output(f"Session resumed, messages {server_last_seq + 1} to {lost_seq} were lost, replayed {replayed} messages, resending the whole state")
+      await self.send_action({
+        "action": "replay-gap",
+        "lastSeq": server_last_seq,
+        "lostSeq": lost_seq,
+      })
+      self.sent_models_version = None
+      await self.send_state()
+      await self.send_tokens_info()
+      return
+
+    # state messages are not buffered, the ones the server missed are sent again
+    server_state_hashes = data.get('stateHashes') or {}
+
+    state_senders = {
+      'update-context-files': self.send_update_context_files,
+      'set-models': self.send_current_models,
+      'update-repo-map': self.send_repo_map,
+      'update-autocompletion': self.send_autocompletion,
+      'tokens-info': self.send_tokens_info,
+    }
+    stale_actions = [action for action, state_hash in self.state_hashes.items() if server_state_hashes.get(action) != state_hash]
+    self.coder.io.tool_output(f"Session resumed, replayed {replayed} messages, resending {stale_actions or 'nothing'}")
+    if 'update-autocompletion' in stale_actions:
+      self.sent_models_version = None
+    for action in stale_actions:
+      await state_senders[action]()
+
+  def get_changed_models(self):
+    """The model names when they were not sent yet or changed since, otherwise None."""
+    index = get_model_index()
+    if index.version == self.sent_models_version:
+      return None
+    self.sent_models_version = index.version
+    return index.names
+
+  async def send_models_search(self, query, limit=20, request_id=None):
+    await self.send_action({
+      "action": "search-models",
+      "requestId": request_id,
+      "query": query,
+      "models": get_model_index().search(query or "", limit)
+    }, False)
+
+  async def _send_tokenized_autocompletion(self, tokenized_words, initial_words, all_relative_files):
     """Sends the final autocompletion message after tokenization."""
     try:
       # Combine initial words with tokenized words
       final_words = initial_words + tokenized_words
 
       # Send the final list of words
-      await self.sio.emit("message", {
+      await self.emit("message", {
         "action": "update-autocompletion",
         "words": final_words,
-        "allFiles": all_relative_files,
-        "models": all_models
+        "allFiles": all_relative_files
       })
     except Exception as e:
       self.coder.io.tool_error(f"Error sending tokenized autocompletion: {str(e)}")
@@ -356,21 +1175,24 @@ class Connector:
       return []
 
   async def on_message(self, data):
-    await self.process_message(data)
+    if data.get('action') == 'profile':
+      await self.process_message(data)
+      return
+    with self.profiler.profiled():
+      await self.process_message(data)
 
   async def on_disconnect(self):
     """Handle disconnection event."""
+    # executors and running work are kept, the client reconnects and resumes the session
+    self.resuming = True
     self.coder.io.tool_output("DISCONNECTED FROM SERVER")
 
-    tokenization_executor = self.tokenization_executor
-    self.tokenization_executor = None
-    if tokenization_executor:
-      # Shutdown the executor if it was created
-      tokenization_executor.shutdown(wait=True, cancel_futures=True)
-
   async def connect(self):
     """Connect to the server."""
-    await self.sio.connect(self.server_url)
+    self.sio, transports = create_socketio_client(self.transport, self.server_socket)
+    self._register_events()
+    server_url = "http://localhost" if self.transport == "unix" else self.server_url
+    await self.sio.connect(server_url, transports=transports)
 
   async def wait(self):
     """Wait for events."""
@@ -380,13 +1202,43 @@ class Connector:
     await self.connect()
     await self.wait()
 
+  async def emit(self, event, data, ack_timeout=None):
+    """Emit a sequenced message, other than state ones they are kept in the replay buffer until pushed out by newer ones.
+
+    With ack_timeout, waits up to that many seconds for the server to acknowledge the message.
+    """
+    data = dict(data)
+    if data.get('action') in STATE_ACTIONS:
+      state_hash = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+      self.state_hashes[data['action']] = state_hash
+      data['stateHash'] = state_hash
+
+    self.outbound_seq += 1
+    data['seq'] = self.outbound_seq
+    if 'stateHash' not in data:
+      self.outbound_buffer.append(event, data)
+
+    if not self.sio or not self.sio.connected or self.resuming:
+      return
+    try:
+      if ack_timeout:
+        await self.sio.call(event, data, timeout=ack_timeout)
+      else:
+        await self.sio.emit(event, data)
+    except socketio.exceptions.TimeoutError:
+      # the message was sent, the server is only slow to process it
+      pass
+    except socketio.exceptions.SocketIOError:
+      # replayed when the session is resumed
+      pass
+
   async def send_action(self, action, with_delay = True):
-    await self.sio.emit('message', action)
+    await self.emit('message', action)
     if with_delay:
       await asyncio.sleep(0.01)
 
   async def send_log_message(self, level, message, finished=False):
-    await self.sio.emit("log", {
+    await self.emit("log", {
       'level': level,
       'message': message,
       'finished': finished
@@ -413,6 +1265,9 @@ class Connector:
         if not prompt:
           return json.dumps({"success": True})
 
+        self.cancel_refresh()
+        await self.wait_for_repo_map_executor()
+        await self.apply_pending_summary()
         try:
             await self.run_prompt(prompt, mode, architect_model, prompt_id, clear_context)
         finally:
@@ -495,6 +1350,7 @@ class Connector:
             dict(role="assistant", content="Ok."),
           ]
         await self.send_tokens_info()
+        self.coder.summarize_start()
 
       elif action == "interrupt-response":
         self.interrupted = True
@@ -505,11 +1361,16 @@ class Connector:
         if not edits:
           return
 
-        edit_tuples = [(edit['path'], edit['original'], edit['updated']) for edit in edits]
-        self.coder.apply_edits(edit_tuples)
-        await self.send_log_message("info", "Files have been updated." if len(edits) > 1 else "File has been updated.")
-        await self.send_update_context_files()
-        await self.send_tokens_info()
+        await self.apply_edits(edits)
+
+      elif action == "memory-telemetry":
+        await self.send_memory_telemetry(message.get('top', 10), message.get('trace'))
+
+      elif action == "profile":
+        await self.run_profiler(message.get('command'), message.get('top', 20))
+
+      elif action == "search-models":
+        await self.send_models_search(message.get('query'), message.get('limit') or 20, message.get('requestId'))
 
       else:
         return json.dumps({
@@ -551,16 +1412,25 @@ class Connector:
 
       # we need to disable auto accept as this does not work properly with AiderDesk
       self.running_coder.auto_accept_architect=False
+
+      if mode == "architect" and self.pipelined_architect:
+        # build the editor coder while the architect is streaming its answer
+        self.editor_coder_future = self.loop.run_in_executor(None, prepare_editor_coder, self.running_coder, self.editor_cache_prompts)
     else:
       self.running_coder = self.coder
 
     # setting usage report to None to avoid no attribute error
     self.running_coder.usage_report = None
+    self.architect_finished_at = None
+    self.editor_latency = None
 
-    global whole_content
-    whole_content = ""
+    response_buffer = ResponseBuffer(self.max_response_size)
+    self.response_buffer = response_buffer
+    edit_block_parser = None
 
     async def run_stream_async():
+      nonlocal edit_block_parser
+      edit_block_parser = EditBlockStreamParser.for_coder(self.running_coder) if self.structured_stream else None
       try:
         for chunk in self.running_coder.run_stream(prompt):
           # add small sleeps here to allow other coroutines to run
@@ -571,27 +1441,33 @@ class Connector:
             yield chunk
       except Exception as e:
         self.coder.io.tool_error(str(e))
+      if edit_block_parser:
+        await self.send_edit_block_events(edit_block_parser.finish())
 
     async for chunk in run_stream_async():
-      whole_content += chunk
+      response_buffer.append(chunk)
       await self.send_action({
         "action": "response",
         "finished": False,
         "content": chunk
       }, False)
+      if edit_block_parser:
+        await self.send_edit_block_events(edit_block_parser.feed(chunk))
 
-    if not whole_content:
+    if not response_buffer:
       # if there was no content, use the partial_response_content value (case for non streaming models)
-      whole_content = self.running_coder.partial_response_content
+      response_buffer.append(self.running_coder.partial_response_content)
 
     # Send final response with complete data
     response_data = {
       "action": "response",
-      "content": whole_content,
+      "content": response_buffer.getvalue(),
       "finished": True,
       "editedFiles": list(self.running_coder.aider_edited_files),
       "usageReport": self.running_coder.usage_report
     }
+    if self.editor_latency:
+      response_data["editorLatency"] = self.editor_latency
 
     # Add commit info if there was one
     if self.running_coder.last_aider_commit_hash:
@@ -610,7 +1486,9 @@ class Connector:
     await self.send_action(response_data)
 
     if self.interrupted:
-      self.running_coder.cur_messages += [dict(role="assistant", content=whole_content + " (interrupted)")]
+      self.running_coder.cur_messages += [dict(role="assistant", content=response_buffer.getvalue() + " (interrupted)")]
+
+    self.editor_coder_future = None
 
     if self.running_coder != self.coder:
       cur_messages = self.coder.cur_messages if clear_context else self.running_coder.cur_messages
@@ -624,10 +1502,10 @@ class Connector:
         cur_messages=cur_messages,
         done_messages=done_messages,
       )
-    await self.send_update_context_files()
 
     # Check for reflections
     if self.running_coder.reflected_message:
+      await self.send_update_context_files()
       current_reflection = 0
       while self.running_coder.reflected_message and not self.interrupted:
         if current_reflection >= self.coder.max_reflections:
@@ -639,19 +1517,21 @@ class Connector:
 
         # use default coder to run the reflection
         self.running_coder = self.coder
-        whole_content = ""
+        response_buffer.clear()
         async for chunk in run_stream_async():
-          whole_content += chunk
+          response_buffer.append(chunk)
           await self.send_action({
             "action": "response",
             "reflectedMessage": prompt,
             "finished": False,
             "content": chunk
           }, False)
+          if edit_block_parser:
+            await self.send_edit_block_events(edit_block_parser.feed(chunk))
 
         response_data = {
           "action": "response",
-          "content": whole_content,
+          "content": response_buffer.getvalue(),
           "reflected_message": prompt,
           "finished": True,
           "editedFiles": list(self.running_coder.aider_edited_files),
@@ -661,22 +1541,240 @@ class Connector:
         await self.send_action(response_data)
 
         if self.interrupted:
-          self.running_coder.cur_messages += [dict(role="assistant", content=whole_content + " (interrupted)")]
+          self.running_coder.cur_messages += [dict(role="assistant", content=response_buffer.getvalue() + " (interrupted)")]
 
         await self.send_update_context_files()
         current_reflection += 1
 
     self.running_coder = None
+    # refresh the rest in background so prompt-finished is not delayed
+    self.schedule_refresh()
+
+  def schedule_refresh(self):
+    """Run the post prompt refreshes in background, superseding the previous run."""
+    self.cancel_refresh()
+    self.refresh_task = self.loop.create_task(self.refresh())
+
+  def cancel_refresh(self):
+    # only the steps not started yet are cancelled, a repo map being built keeps running
+    if self.refresh_task and not self.refresh_task.done():
+      self.refresh_task.cancel()
+    self.refresh_task = None
+
+  async def wait_for_repo_map_executor(self):
+    """Waits for the repo map and git work already running in background, a prompt must not race it on the coder."""
+    if self.repo_map_executor:
+      await self.loop.run_in_executor(self.repo_map_executor, lambda: None)
+
+  async def refresh(self):
+    with self.profiler.profiled():
+      await self.refresh_state()
+
+  async def refresh_state(self):
+    try:
+      await self.send_update_context_files()
+      await self.send_tokens_info()
+      await self.send_repo_map()
+      await self.send_autocompletion()
+    except Exception as e:
+      self.coder.io.tool_error(f"Error refreshing after prompt: {str(e)}")
+
+  async def get_editor_coder(self, architect_coder):
+    editor_coder_future = self.editor_coder_future
+    self.editor_coder_future = None
+
+    if editor_coder_future:
+      try:
+        editor_coder = await editor_coder_future
+        # sync the state that could have changed while the architect was streaming
+        editor_coder.abs_fnames = set(architect_coder.abs_fnames)
+        editor_coder.abs_read_only_fnames = set(architect_coder.abs_read_only_fnames)
+        editor_coder.total_cost = architect_coder.total_cost
+        editor_coder.aider_commit_hashes = architect_coder.aider_commit_hashes
+        return editor_coder
+      except Exception as e:
+        self.coder.io.tool_output(f"Preparing editor coder failed, creating it again: {str(e)}")
+
+    return create_editor_coder(architect_coder, self.editor_cache_prompts)
+
+  def run_shell_command(self, command, verbose=False, error_print=None, cwd=None):
+    """Replacement of aider's run_cmd sending the output as command-output messages, returns (exit_status, output)."""
+    stream = self.coder.io.get_command_output(command)
+    if verbose:
+      print("Running command:", command)
+    if platform.system() == "Windows" and get_windows_parent_process_name() == "powershell.exe":
+      command = f"powershell -Command {command}"
+
+    try:
+      process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        shell=True,
+        cwd=cwd,
+      )
+    except OSError as e:
+      error_message = f"Error occurred while running command '{command}': {str(e)}"
+      if error_print is None:
+        print(error_message)
+      else:
+        error_print(error_message)
+      stream.finish(1)
+      return 1, error_message
+
+    decoder = codecs.getincrementaldecoder(sys.stdout.encoding or "utf-8")(errors="replace")
+    read_size = stream.batch_size
+    while True:
+      data = process.stdout.read1(read_size)
+      if not data:
+        break
+      stream.write(decoder.decode(data))
+      if len(data) < read_size:
+        # nothing more buffered in the pipe right now
+        stream.flush()
+    stream.write(decoder.decode(b"", final=True))
+
+    exit_status = process.wait()
+    stream.finish(exit_status)
+    return exit_status, stream.getvalue()
+
+  async def send_edit_block_events(self, events):
+    for event in events:
+      await self.send_action(event, False)
+
+  def report_editor_latency(self, started_at):
+    first_chunk_at = time.monotonic()
+    self.editor_latency = {
+      "afterConfirmMs": round((first_chunk_at - started_at) * 1000),
+    }
+    if self.architect_finished_at:
+      self.editor_latency["afterArchitectMs"] = round((first_chunk_at - self.architect_finished_at) * 1000)
+    self.coder.io.tool_output(f"Editor first chunk latency: {self.editor_latency}")
+
+  def get_chat_history_tokens(self):
+    msgs = self.coder.done_messages + self.coder.cur_messages
+    return self.coder.main_model.token_count(msgs) if msgs else 0
+
+  def get_summarizer(self, coder):
+    """The coder summarizer, limited to the threshold of the context window when it is lower than aider's own limit."""
+    summarizer = coder.summarizer
+    max_input_tokens = coder.main_model.info.get("max_input_tokens")
+    if max_input_tokens and max_input_tokens * self.summarize_threshold < summarizer.max_tokens:
+      summarizer = ChatSummary(summarizer.models, int(max_input_tokens * self.summarize_threshold))
+    return summarizer
+
+  def summarize_start(self, coder):
+    """Replacement of Coder.summarize_start, summarizes older chat history in background once it gets over the limit."""
+    if self.summarization_future or self.pending_summary:
+      return
+
+    done_messages = list(coder.done_messages)
+    summarizer = self.get_summarizer(coder)
+    if not done_messages or not summarizer.too_big(done_messages):
+      return
+
+    tokens = coder.main_model.token_count(done_messages)
+    coder.io.tool_output(f"Summarizing chat history in background ({tokens} tokens).")
+    future = self.get_summarization_executor().submit(summarizer.summarize, list(done_messages))
+    self.summarization_future = future
+    future.add_done_callback(partial(self.on_summarization_done, done_messages, tokens))
+
+  def on_summarization_done(self, summarized_messages, tokens, future):
+    """Called in the summarization thread, the summary waits for the next swap point."""
+    if self.summarization_future is not future or future.cancelled():
+      return
+    try:
+      summary = future.result()
+    except Exception as e:
+      self.summarization_future = None
+      asyncio.run_coroutine_threadsafe(self.send_log_message("warning", f"Chat history summarization failed: {str(e)}"), self.loop)
+      return
+
+    if summary != summarized_messages:
+      self.pending_summary = (summarized_messages, summary, tokens)
+    self.summarization_future = None
+    # swap right away when idle, otherwise the running coder picks it up
+    self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self.apply_pending_summary()))
+
+  def summarize_end(self, coder):
+    """Replacement of Coder.summarize_end, swaps in a finished summary without waiting for a running one."""
+    tokens = self.swap_in_summary(coder)
+    if tokens is not None:
+      wait_for_async(self, self.send_log_message("info", f"Chat history summarized ({tokens} -> {coder.main_model.token_count(coder.done_messages)} tokens)."))
+
+  def swap_in_summary(self, coder):
+    """Replace the summarized prefix of the coder chat history, returns its former token count when swapped."""
+    pending_summary = self.pending_summary
+    if not pending_summary or not coder.done_messages:
+      return None
+    self.pending_summary = None
+
+    summarized_messages, summary, tokens = pending_summary
+    done_messages = coder.done_messages
+    if done_messages[:len(summarized_messages)] != summarized_messages:
+      # History was cleared or reloaded while summarizing
+      return None
+
+    coder.done_messages = summary + done_messages[len(summarized_messages):]
+    return tokens
+
+  async def apply_pending_summary(self):
+    if self.running_coder:
+      # swapped by the running coder when it formats its next request
+      return
+    tokens = self.swap_in_summary(self.coder)
+    if tokens is None:
+      return
+    await self.send_log_message("info", f"Chat history summarized ({tokens} -> {self.get_chat_history_tokens()} tokens).")
     await self.send_tokens_info()
-    await self.send_repo_map()
-    await self.send_autocompletion()
 
-    # Send prompt-finished message if we have a prompt ID
-    if prompt_id:
-      await self.send_action({
-        "action": "prompt-finished",
-        "promptId": prompt_id
-      })
+  async def apply_edits(self, edits):
+    """Apply edits grouped per file, all files are written or none of them."""
+    edits_by_path = {}
+    for edit in edits:
+      edits_by_path.setdefault(edit['path'], []).append((edit['original'], edit['updated']))
+
+    # matching is CPU bound, only worth the worker processes for large batches
+    executor = create_edits_executor(len(edits_by_path)) if len(edits_by_path) >= PARALLEL_EDITS_MIN_FILES else None
+
+    async def prepare_file_edits(path, file_edits):
+      full_path = self.coder.abs_root_path(path)
+      original_content = await self.loop.run_in_executor(None, read_file_to_edit, self.coder.io, full_path)
+      new_content = await self.loop.run_in_executor(executor, replace_file_edits, full_path, original_content, file_edits, self.coder.fence)
+      return full_path, original_content, new_content
+
+    try:
+      results = await asyncio.gather(*[
+        prepare_file_edits(path, file_edits)
+        for path, file_edits in edits_by_path.items()
+      ], return_exceptions=True)
+    finally:
+      if executor:
+        # the workers are only kept for the batch, they exit on their own once idle
+        executor.shutdown(wait=False)
+
+    failed = [(path, result) for path, result in zip(edits_by_path, results) if isinstance(result, Exception)]
+    if failed:
+      failures = "\n".join(f"- {path}: {str(error)}" for path, error in failed)
+      await self.send_log_message("error", f"No files were updated, edits failed for {len(failed)} of {len(edits_by_path)} files:\n{failures}")
+      return
+
+    files = [result for result in results if result[1] != result[2]]
+    try:
+      if not self.coder.io.dry_run:
+        write_files_atomically(files, self.coder.io.encoding, getattr(self.coder.io, "newline", None))
+    except Exception as e:
+      await self.send_log_message("error", f"No files were updated, writing the files failed: {str(e)}")
+      return
+
+    for full_path, _original_content, _new_content in files:
+      self.file_tokens_cache.pop(full_path, None)
+
+    updated_files = "\n".join(f"- {path}" for path in edits_by_path)
+    await self.send_log_message("info", f"Files have been updated:\n{updated_files}" if len(edits_by_path) > 1 else "File has been updated.")
+    await self.send_update_context_files()
+    await self.send_tokens_info()
 
   async def add_file(self, path, read_only, no_update=False):
     """Add a file to the coder's tracked files"""
@@ -700,8 +1798,20 @@ class Connector:
       await self.send_autocompletion()
 
   async def run_command(self, command):
-    if command.startswith("/map"):
-      repo_map = self.coder.repo_map.get_repo_map(set(), self.coder.get_all_abs_files()) if self.coder.repo_map else None
+    if command.startswith("/memory"):
+      parts = command.split()
+      trace_commands = {"trace": True, "untrace": False}
+      if len(parts) > 1 and parts[1] not in trace_commands:
+        await self.send_log_message("error", "Invalid memory command. Use '/memory [trace|untrace]'.")
+        return
+      await self.send_memory_telemetry(trace=trace_commands.get(parts[1]) if len(parts) > 1 else None)
+      return
+    elif command.startswith("/profile"):
+      parts = command.split()
+      await self.run_profiler(parts[1] if len(parts) > 1 else None)
+      return
+    elif command.startswith("/map"):
+      repo_map = await self.loop.run_in_executor(self.get_repo_map_executor(), self.get_repo_map, self.coder) if self.coder.repo_map else None
       await asyncio.sleep(0.1)
       if repo_map:
         await self.send_log_message("info", repo_map)
@@ -735,6 +1845,7 @@ class Connector:
       await self.send_log_message("loading", "Committing changes...")
 
     self.coder.commands.run(command)
+    self.coder.io.reset_state()
     self.coder.io.running_shell_command = False
     self.coder.io.processing_loading_message = False
     if command.startswith("/paste"):
@@ -765,6 +1876,94 @@ class Connector:
       await self.send_autocompletion()
       await self.send_tokens_info()
 
+  async def run_profiler(self, command, top=20):
+    if command == "start":
+      self.profiler.start()
+      await self.send_log_message("info", "Profiling started, use '/profile stop' to get the results.")
+    elif command == "stop":
+      path, summary = self.profiler.stop(top)
+      if not path:
+        await self.send_log_message("warning", "Profiler is not running.")
+        return
+      await self.send_log_message("info", f"Profile saved to {path}\n\n{summary}")
+    else:
+      await self.send_log_message("error", "Invalid profile command. Use '/profile [start|stop]'.")
+
+  def get_memory_telemetry(self, top=10):
+    messages = self.coder.done_messages + self.coder.cur_messages
+    telemetry = {
+      "rss": psutil.Process().memory_info().rss,
+      "messages": {
+        "count": len(messages),
+        "size": sum(len(str(message.get("content") or "")) for message in messages),
+        "tokens": self.get_chat_history_tokens(),
+      },
+      "caches": {
+        "fileTokens": len(self.file_tokens_cache),
+        "responseBuffer": self.response_buffer.size,
+        "replayBuffer": self.outbound_buffer.size,
+        "fileListing": len(self.file_listing.relative_files),
+      },
+      "fileListing": {
+        "hits": self.file_listing.hits,
+        "misses": self.file_listing.misses,
+      },
+    }
+
+    repo_map = self.coder.repo_map
+    if repo_map:
+      for name in ["map_cache", "tree_cache", "tree_context_cache"]:
+        cache = getattr(repo_map, name, None)
+        if cache is not None:
+          telemetry["caches"][f"repoMap.{name}"] = len(cache)
+      tags_cache = getattr(repo_map, "TAGS_CACHE", None)
+      if isinstance(tags_cache, dict):
+        telemetry["caches"]["repoMap.TAGS_CACHE"] = len(tags_cache)
+
+    if tracemalloc.is_tracing():
+      statistics = tracemalloc.take_snapshot().statistics("lineno")[:top]
+      telemetry["allocations"] = [
+        {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+        for stat in statistics
+      ]
+    else:
+      telemetry["allocations"] = None
+
+    return telemetry
+
+  async def send_memory_telemetry(self, top=10, trace=None):
+    """Send the memory telemetry, trace starts (True) or stops (False) the allocation tracing."""
+    started_tracing = trace and not tracemalloc.is_tracing()
+    if started_tracing:
+      tracemalloc.start()
+    telemetry = self.get_memory_telemetry(top)
+    if trace is False and tracemalloc.is_tracing():
+      # tracing slows down every allocation, it is not left running
+      tracemalloc.stop()
+
+    lines = [
+      f"RSS: {format_size(telemetry['rss'])}",
+      f"Chat history: {telemetry['messages']['count']} messages, {format_size(telemetry['messages']['size'])}, {telemetry['messages']['tokens']} tokens",
+      "Caches: " + ", ".join(f"{name}={size}" for name, size in telemetry["caches"].items()),
+      f"File listing: {telemetry['fileListing']['hits']} enumerations saved, {telemetry['fileListing']['misses']} performed",
+    ]
+    if started_tracing:
+      # tracing only covers allocations made after it is started
+      lines.append("Allocation tracing started, top allocations will be reported on the next request. Use '/memory untrace' to stop it.")
+    elif telemetry["allocations"] is None:
+      lines.append("Allocation tracing is off, use '/memory trace' to start it.")
+    else:
+      lines.append("Top allocations:")
+      lines += [f"  {format_size(stat['size'])} in {stat['count']} blocks at {stat['location']}" for stat in telemetry["allocations"]]
+      if trace is False:
+        lines.append("Allocation tracing stopped.")
+
+    await self.send_action({
+      "action": "memory-telemetry",
+      "telemetry": telemetry
+    })
+    await self.send_log_message("info", "\n".join(lines))
+
   async def send_autocompletion(self):
     if not self.sio:
       return
@@ -772,17 +1971,19 @@ class Connector:
       inchat_files = self.coder.get_inchat_relative_files()
       read_only_files = [self.coder.get_rel_fname(fname) for fname in self.coder.abs_read_only_fnames]
       rel_fnames = sorted(set(inchat_files + read_only_files))
-      all_relative_files = self.coder.get_all_relative_files()
-      all_models = sorted(set(models.fuzzy_match_models("") + [model_settings.name for model_settings in models.MODEL_SETTINGS]))
+      all_relative_files = await self.loop.run_in_executor(self.get_repo_map_executor(), self.file_listing.get_relative_files, self.coder)
 
       # Initialize words with just the filenames and send immediately
       initial_words = [fname.split('/')[-1] for fname in rel_fnames]
-      await self.sio.emit("message", {
+      message = {
         "action": "update-autocompletion",
         "words": initial_words,
-        "allFiles": all_relative_files,
-        "models": all_models
-      })
+        "allFiles": all_relative_files
+      }
+      changed_models = self.get_changed_models()
+      if changed_models is not None:
+        message["models"] = changed_models
+      await self.emit("message", message)
       await asyncio.sleep(0.01) # Allow message to send
 
       # Run tokenization in a separate thread
@@ -797,7 +1998,7 @@ class Connector:
             self._tokenize_files_sync,
             self.coder.root,
             rel_fnames,
-            self.coder.get_addable_relative_files(),
+            self.file_listing.get_addable_relative_files(self.coder),
             self.coder.io.encoding,
             self.coder.abs_read_only_fnames
         )
@@ -811,7 +2012,7 @@ class Connector:
             # Schedule the sending of the final autocompletion message
             self.loop.create_task(
               self._send_tokenized_autocompletion(
-                tokenized_words, initial_words, all_relative_files, all_models
+                tokenized_words, initial_words, all_relative_files
               )
             )
           except Exception as e:
@@ -823,24 +2024,28 @@ class Connector:
       # else: The initial message with just filenames is sufficient if too many files
     except Exception as e:
       self.coder.io.tool_error(f"Error in send_autocompletion: {str(e)}")
-      await self.sio.emit("message", {
+      await self.emit("message", {
         "action": "update-autocompletion",
         "words": [],
-        "allFiles": [],
-        "models": sorted(set(models.fuzzy_match_models("") + [model_settings.name for model_settings in models.MODEL_SETTINGS]))
+        "allFiles": []
       })
 
+  def get_repo_map(self, coder):
+    abs_files = self.file_listing.get_abs_files(coder)
+    with get_repo_map_lock(coder.repo_map):
+      return coder.repo_map.get_repo_map(set(), abs_files)
+
   async def send_repo_map(self):
     if self.sio and self.coder.repo_map:
       try:
-        repo_map = self.coder.repo_map.get_repo_map(set(), self.coder.get_all_abs_files())
+        repo_map = await self.loop.run_in_executor(self.get_repo_map_executor(), self.get_repo_map, self.coder)
         if repo_map:
           # Remove the prefix before sending
           prefix = self.coder.gpt_prompts.repo_content_prefix
           if repo_map.startswith(prefix):
               repo_map = repo_map[len(prefix):]
 
-          await self.sio.emit("message", {
+          await self.emit("message", {
             "action": "update-repo-map",
             "repoMap": repo_map
           })
@@ -859,7 +2064,7 @@ class Connector:
                         {"path": fname, "readOnly": True} for fname in read_only_files
                       ]
 
-      await self.sio.emit("message", {
+      await self.emit("message", {
         "action": "update-context-files",
         "files": context_files
       })
@@ -873,7 +2078,7 @@ class Connector:
       if self.coder.main_model.missing_keys:
         error = "Missing keys for the model: " + ", ".join(self.coder.main_model.missing_keys)
 
-      await self.sio.emit("message", {
+      await self.emit("message", {
         "action": "set-models",
         "mainModel": self.coder.main_model.name,
         "weakModel": self.coder.main_model.weak_model.name,
@@ -884,47 +2089,62 @@ class Connector:
         "error": error
       })
 
-  async def send_tokens_info(self):
-    cost_per_token = self.coder.main_model.info.get("input_cost_per_token") or 0
+  def get_file_tokens(self, coder, fname, relative_fname):
+    """Token count of a file, cached until the file or the main model changes. Returns None for unreadable files."""
+    try:
+      stat = os.stat(fname)
+      cache_key = (coder.main_model.name, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+      cache_key = None
+
+    cached = self.file_tokens_cache.get(fname)
+    if cache_key and cached and cached[0] == cache_key:
+      return cached[1]
+
+    fence = "`" * 3
+    if is_image_file(relative_fname):
+      tokens = coder.main_model.token_count_for_image(fname)
+    else:
+      content = coder.io.read_text(fname)
+      if content is not None:
+        # approximate
+        content = f"{relative_fname}\n{fence}\n" + content + "{fence}\n"
+        tokens = coder.main_model.token_count(content)
+      else:
+        tokens = None
+
+    if cache_key:
+      self.file_tokens_cache[fname] = (cache_key, tokens)
+    return tokens
+
+  def get_tokens_info(self, coder, system_messages, chat_messages, abs_fnames, abs_read_only_fnames):
+    """Token counts and costs of the context parts read on the loop, runs on the repo map executor."""
+    cost_per_token = coder.main_model.info.get("input_cost_per_token") or 0
     info = {
       "files": {}
     }
 
-    self.coder.choose_fence()
-
     # system messages
-    main_sys = self.coder.fmt_system_prompt(self.coder.gpt_prompts.main_system)
-    main_sys += "\n" + self.coder.fmt_system_prompt(self.coder.gpt_prompts.system_reminder)
-    msgs = [
-      dict(role="system", content=main_sys),
-      dict(
-        role="system",
-        content=self.coder.fmt_system_prompt(self.coder.gpt_prompts.system_reminder),
-      ),
-    ]
-    tokens = self.coder.main_model.token_count(msgs)
+    tokens = coder.main_model.token_count(system_messages)
     info["systemMessages"] = {
       "tokens": tokens,
       "cost": tokens * cost_per_token,
     }
 
     # chat history
-    msgs = self.coder.done_messages + self.coder.cur_messages
-    if msgs:
-      tokens = self.coder.main_model.token_count(msgs)
-    else:
-      tokens = 0
+    tokens = coder.main_model.token_count(chat_messages) if chat_messages else 0
     info["chatHistory"] = {
       "tokens": tokens,
       "cost": tokens * cost_per_token,
     }
 
     # repo map
-    other_files = set(self.coder.get_all_abs_files()) - set(self.coder.abs_fnames)
-    if self.coder.repo_map:
-      repo_content = self.coder.repo_map.get_repo_map(self.coder.abs_fnames, other_files)
+    if coder.repo_map:
+      other_files = set(self.file_listing.get_abs_files(coder)) - abs_fnames
+      with get_repo_map_lock(coder.repo_map):
+        repo_content = coder.repo_map.get_repo_map(abs_fnames, other_files)
       if repo_content:
-        tokens = self.coder.main_model.token_count(repo_content)
+        tokens = coder.main_model.token_count(repo_content)
       else:
         tokens = 0
     else:
@@ -934,40 +2154,59 @@ class Connector:
       "cost": tokens * cost_per_token,
     }
 
-    fence = "`" * 3
+    # files dropped from the chat are not counted anymore
+    fnames = abs_fnames | abs_read_only_fnames
+    for fname in list(self.file_tokens_cache):
+      if fname not in fnames:
+        self.file_tokens_cache.pop(fname, None)
 
     # files
-    for fname in self.coder.abs_fnames:
-      relative_fname = self.coder.get_rel_fname(fname)
-      content = self.coder.io.read_text(fname)
-      if is_image_file(relative_fname):
-        tokens = self.coder.main_model.token_count_for_image(fname)
-      elif content is not None:
-        # approximate
-        content = f"{relative_fname}\n{fence}\n" + content + "{fence}\n"
-        tokens = self.coder.main_model.token_count(content)
-      else:
-        tokens = 0
+    for fname in abs_fnames:
+      relative_fname = coder.get_rel_fname(fname)
+      tokens = self.get_file_tokens(coder, fname, relative_fname) or 0
       info["files"][relative_fname] = {
         "tokens": tokens,
         "cost": tokens * cost_per_token,
       }
 
     # read-only files
-    for fname in self.coder.abs_read_only_fnames:
-      relative_fname = self.coder.get_rel_fname(fname)
-      content = self.coder.io.read_text(fname)
-      if content is not None and not is_image_file(relative_fname):
-        # approximate
-        content = f"{relative_fname}\n{fence}\n" + content + "{fence}\n"
-        tokens = self.coder.main_model.token_count(content)
+    for fname in abs_read_only_fnames:
+      relative_fname = coder.get_rel_fname(fname)
+      if is_image_file(relative_fname):
+        continue
+      tokens = self.get_file_tokens(coder, fname, relative_fname)
+      if tokens is not None:
         info["files"][relative_fname] = {
           "tokens": tokens,
           "cost": tokens * cost_per_token,
         }
 
+    return info
+
+  async def send_tokens_info(self):
+    # the coder state is read here, repo map and token counting take seconds on large repos and run in background
+    coder = self.coder
+    coder.choose_fence()
+    main_sys = coder.fmt_system_prompt(coder.gpt_prompts.main_system)
+    main_sys += "\n" + coder.fmt_system_prompt(coder.gpt_prompts.system_reminder)
+    system_messages = [
+      dict(role="system", content=main_sys),
+      dict(
+        role="system",
+        content=coder.fmt_system_prompt(coder.gpt_prompts.system_reminder),
+      ),
+    ]
+    info = await self.loop.run_in_executor(
+      self.get_repo_map_executor(),
+      self.get_tokens_info,
+      coder,
+      system_messages,
+      coder.done_messages + coder.cur_messages,
+      set(coder.abs_fnames),
+      set(coder.abs_read_only_fnames),
+    )
     if self.sio:
-      await self.sio.emit("message", {
+      await self.emit("message", {
         "action": "tokens-info",
         "info": info
       })
@@ -977,6 +2216,64 @@ def main(argv=None):
   if argv is None:
     argv = sys.argv[1:]
 
+  # Aider parses sys.argv on its own, so connector only arguments must be removed from it
+  connector_parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+  connector_parser.add_argument("--summarize-threshold", type=float, default=0.5, help="Fraction of the main model context window after which the chat history is summarized in background, aider's own chat history limit applies when lower (0 to summarize the aider way)")
+  connector_parser.add_argument("--pipelined-architect", action="store_true", help="Prepare the editor coder while the architect is still streaming")
+  connector_parser.add_argument("--pipelined-architect-auto-accept", action="store_true", help="Start the editor right after the architect answer without asking (implies --pipelined-architect)")
+  connector_parser.add_argument("--max-response-size", type=int, default=4_000_000, help="Maximum number of characters of a response kept in memory")
+  connector_parser.add_argument("--replay-buffer-size", type=int, default=8_000_000, help="Maximum number of characters of the sent messages kept for replay after a reconnect")
+  connector_parser.add_argument("--trace-memory", action="store_true", help="Trace memory allocations from the start for memory telemetry, otherwise started with '/memory trace'")
+  connector_parser.add_argument("--profile", action="store_true", help="Profile the connector actions from the start, the results are written on '/profile stop', exit or SIGTERM")
+  connector_parser.add_argument("--profile-dir", type=str, default=None, help="Directory for the profiler output (defaults to the temp directory)")
+  connector_parser.add_argument("--batch", type=str, default=None, metavar="JOBS_FILE", help="Run the prompts of a JSONL jobs file headless instead of connecting to AiderDesk")
+  connector_parser.add_argument("--batch-output", type=str, default=None, help="JSONL file for the batch results (defaults to JOBS_FILE.results.jsonl)")
+  connector_parser.add_argument("--batch-concurrency", type=int, default=4, help="Number of batch jobs run in parallel")
+  connector_parser.add_argument("--structured-stream", action="store_true", help="Send edit-block-start/delta/end events parsed from the streamed answer")
+  connector_parser.add_argument("--max-command-output", type=int, default=1_000_000, help="Maximum number of characters of a shell command output sent and kept")
+  connector_parser.add_argument("--editor-cache-prompts", action="store_true", help="Enable prompt caching for the editor coder of architect mode on models supporting it")
+  connector_args, argv = connector_parser.parse_known_args(argv)
+  sys.argv = sys.argv[:1] + argv
+
+  if connector_args.trace_memory:
+    tracemalloc.start()
+
+  profiler = Profiler(connector_args.profile_dir)
+  if connector_args.profile:
+    profiler.start()
+
+    def write_profile():
+      path, summary = profiler.stop()
+      if path:
+        print(f"Profile saved to {path}\n{summary}")
+
+    atexit.register(write_profile)
+
+    def on_sigterm(signum, _frame):
+      # AiderDesk stops the connector with SIGTERM, atexit handlers would wait for the worker threads first
+      write_profile()
+      sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+  if connector_args.batch:
+    failed = run_batch(
+      connector_args.batch,
+      connector_args.batch_output or f"{os.path.splitext(connector_args.batch)[0]}.results.jsonl",
+      connector_args.batch_concurrency,
+      argv,
+      {
+        "summarize_threshold": connector_args.summarize_threshold,
+        "pipelined_architect": connector_args.pipelined_architect,
+        "max_response_size": connector_args.max_response_size,
+        "replay_buffer_size": 0,
+        "structured_stream": connector_args.structured_stream,
+        "max_command_output": connector_args.max_command_output,
+        "editor_cache_prompts": connector_args.editor_cache_prompts,
+      }
+    )
+    sys.exit(1 if failed else 0)
+
   parser = argparse.ArgumentParser(description="AiderDesk Connector")
   parser.add_argument("--watch-files", action="store_true", help="Watch files for changes")
   parser.add_argument("--reasoning-effort", type=str, default=None, help="Set the reasoning effort for the model")
@@ -984,16 +2281,140 @@ def main(argv=None):
   args, _ = parser.parse_known_args(argv) # Use parse_known_args to ignore unknown args
 
   server_url = os.getenv("CONNECTOR_SERVER_URL", "http://localhost:24337")
+  server_socket = os.getenv("CONNECTOR_SERVER_SOCKET")
+  transport = os.getenv("CONNECTOR_TRANSPORT", "polling")
+  if transport == "unix" and not server_socket:
+    transport = "websocket"
+
   base_dir = os.getcwd()
   connector = Connector(
     base_dir,
     watch_files=args.watch_files,
     server_url=server_url,
+    transport=transport,
+    server_socket=server_socket,
     reasoning_effort=args.reasoning_effort,
-    thinking_tokens=args.thinking_tokens
+    thinking_tokens=args.thinking_tokens,
+    summarize_threshold=connector_args.summarize_threshold,
+    pipelined_architect=connector_args.pipelined_architect,
+    pipelined_architect_auto_accept=connector_args.pipelined_architect_auto_accept,
+    max_response_size=connector_args.max_response_size,
+    replay_buffer_size=connector_args.replay_buffer_size,
+    profiler=profiler,
+    structured_stream=connector_args.structured_stream,
+    max_command_output=connector_args.max_command_output,
+    editor_cache_prompts=connector_args.editor_cache_prompts
   )
   asyncio.run(connector.start())
 
+class HeadlessSocket:
+  """Stand-in for the socket.io client in batch mode, collects the emitted messages."""
+  connected = True
+
+  def __init__(self):
+    self.sent = []
+
+  async def emit(self, event, data=None):
+    self.sent.append((event, data))
+
+  async def call(self, event, data=None, timeout=None):
+    self.sent.append((event, data))
+
+def read_batch_jobs(jobs_file):
+  """Read the JSONL jobs file, each line is {repo, prompt, files?, readOnlyFiles?, mode?, model?, architectModel?, args?, id?}."""
+  jobs = []
+  with open(jobs_file, "r", encoding="utf-8") as f:
+    for line_number, line in enumerate(f, 1):
+      line = line.strip()
+      if not line:
+        continue
+      job = json.loads(line)
+      if not job.get("repo") or not job.get("prompt"):
+        raise ValueError(f"{jobs_file}:{line_number}: job requires 'repo' and 'prompt'")
+      job["repo"] = os.path.abspath(job["repo"])
+      job.setdefault("id", str(line_number))
+      jobs.append(job)
+  return jobs
+
+def get_batch_job_args(job, aider_args):
+  args = list(aider_args)
+  if job.get("model"):
+    args += ["--model", job["model"]]
+  for fname in job.get("readOnlyFiles") or []:
+    args += ["--read", fname]
+  args += job.get("args") or []
+  args += job.get("files") or []
+  return args
+
+def run_batch_job(job, aider_args=(), connector_options=None):
+  """Run one batch job, in its own process as aider keeps global state (cwd, argv, litellm)."""
+  started_at = time.monotonic()
+  result = {
+    "id": job["id"],
+    "repo": job["repo"],
+    "mode": job.get("mode") or "code",
+    "success": False,
+  }
+  prompt_started_at = None
+  try:
+    os.chdir(job["repo"])
+    sys.argv = sys.argv[:1] + get_batch_job_args(job, aider_args)
+    connector = Connector(os.getcwd(), headless=True, **(connector_options or {}))
+    connector.sio = HeadlessSocket()
+
+    prompt_started_at = time.monotonic()
+    connector.loop.run_until_complete(connector.run_prompt(job["prompt"], job.get("mode"), job.get("architectModel"), job["id"]))
+    connector.cancel_refresh()
+
+    messages = [data for event, data in connector.sio.sent if event == "message"]
+    logs = [data for event, data in connector.sio.sent if event == "log"]
+    responses = [message for message in messages if message.get("action") == "response" and message.get("finished")]
+    edited_files = []
+    for response in responses:
+      edited_files += [fname for fname in response.get("editedFiles") or [] if fname not in edited_files]
+    commit = next((response for response in reversed(responses) if response.get("commitHash")), {})
+
+    result.update({
+      "success": True,
+      "responses": [response["content"] for response in responses],
+      "editedFiles": edited_files,
+      "commitHash": commit.get("commitHash"),
+      "commitMessage": commit.get("commitMessage"),
+      "diff": commit.get("diff"),
+      "usageReports": [response["usageReport"] for response in responses if response.get("usageReport")],
+      "errors": [log["message"] for log in logs if log["level"] == "error"],
+    })
+  except BaseException as e:
+    result["error"] = str(e) or type(e).__name__
+
+  finished_at = time.monotonic()
+  result["timings"] = {
+    "setup": round((prompt_started_at or finished_at) - started_at, 3),
+    "prompt": round(finished_at - prompt_started_at, 3) if prompt_started_at else None,
+    "total": round(finished_at - started_at, 3),
+  }
+  return result
+
+def run_batch(jobs_file, output_file, concurrency, aider_args, connector_options):
+  """Run the jobs on a process pool and write one JSONL result per job, returns the number of failed jobs."""
+  jobs = read_batch_jobs(jobs_file)
+  failed = 0
+  if not jobs:
+    return failed
+
+  # spawn and one job per process, coders are not safe to share between jobs
+  context = multiprocessing.get_context("spawn")
+  run_job = partial(run_batch_job, aider_args=aider_args, connector_options=connector_options)
+  with context.Pool(processes=max(1, min(concurrency, len(jobs))), maxtasksperchild=1) as pool, open(output_file, "w", encoding="utf-8") as output:
+    for done, result in enumerate(pool.imap_unordered(run_job, jobs), 1):
+      output.write(json.dumps(result) + "\n")
+      output.flush()
+      if not result["success"]:
+        failed += 1
+      status = "done" if result["success"] else f"failed: {result['error']}"
+      print(f"[{done}/{len(jobs)}] {result['id']} ({result['repo']}) {status} in {result['timings']['total']}s", file=sys.stderr)
+  return failed
+
 
 if __name__ == "__main__":
   main()
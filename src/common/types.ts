@@ -29,10 +29,29 @@ export interface ResponseCompletedData {
   usageReport?: UsageReportData;
 }
 
+export type EditBlockFormat = 'editblock' | 'whole' | 'udiff';
+
+export type EditBlockSection = 'search' | 'replace' | 'content' | 'hunk';
+
+export interface EditBlockData {
+  messageId: string;
+  baseDir: string;
+  event: 'start' | 'delta' | 'end';
+  blockId: number;
+  path?: string;
+  format?: EditBlockFormat;
+  section?: EditBlockSection;
+  content?: string;
+  complete?: boolean;
+}
+
 export interface CommandOutputData {
   baseDir: string;
+  commandId: string;
   command: string;
   output: string;
+  finished?: boolean;
+  exitCode?: number;
 }
 
 export type LogLevel = 'info' | 'warning' | 'error' | 'loading';
@@ -63,7 +82,7 @@ export interface AutocompletionData {
   baseDir: string;
   words: string[];
   allFiles: string[];
-  models: string[];
+  models?: string[];
 }
 
 export interface SessionData {
@@ -212,6 +231,8 @@ export interface AgentConfig {
 export interface UsageReportData {
   sentTokens: number;
   receivedTokens: number;
+  cacheWriteTokens?: number;
+  cacheReadTokens?: number;
   messageCost: number;
   aiderTotalCost?: number;
   agentTotalCost?: number;
@@ -38,6 +38,8 @@ export const delay = (ms: number): Promise<void> => new Promise((resolve) => set
 
 export const parseUsageReport = (report: string): UsageReportData => {
   const sentMatch = report.match(/Tokens: ([\d.]+k?) sent/);
+  const cacheWriteMatch = report.match(/([\d.]+k?) cache write/);
+  const cacheReadMatch = report.match(/([\d.]+k?) cache hit/);
   const receivedMatch = report.match(/([\d.]+k?) received/);
   const messageCostMatch = report.match(/Cost: \$(\d+\.\d+) message/);
   const totalCostMatch = report.match(/\$(\d+\.\d+) session/);
@@ -51,6 +53,8 @@ export const parseUsageReport = (report: string): UsageReportData => {
 
   const sentTokens = sentMatch ? parseTokens(sentMatch[1]) : 0;
   const receivedTokens = receivedMatch ? parseTokens(receivedMatch[1]) : 0;
+  const cacheWriteTokens = cacheWriteMatch ? parseTokens(cacheWriteMatch[1]) : undefined;
+  const cacheReadTokens = cacheReadMatch ? parseTokens(cacheReadMatch[1]) : undefined;
 
   const messageCost = messageCostMatch ? parseFloat(messageCostMatch[1]) : 0;
   const aiderTotalCost = totalCostMatch ? parseFloat(totalCostMatch[1]) : 0;
@@ -58,6 +62,8 @@ export const parseUsageReport = (report: string): UsageReportData => {
   return {
     sentTokens,
     receivedTokens,
+    cacheWriteTokens,
+    cacheReadTokens,
     messageCost,
     aiderTotalCost,
   };
@@ -1,20 +1,27 @@
-import { Server as HttpServer } from 'http';
+import { createServer, Server as HttpServer } from 'http';
+import { connect } from 'net';
+import { existsSync, unlinkSync } from 'fs';
 
 import { ModelsData, QuestionData, TokensInfoData } from '@common/types';
 import { BrowserWindow } from 'electron';
 import { Server, Socket } from 'socket.io';
 import { Connector } from 'src/main/connector';
 import { ProjectManager } from 'src/main/project-manager';
-import { SERVER_PORT } from 'src/main/constants';
+import { CONNECTOR_TRANSPORT, SERVER_PORT, SERVER_SOCKET_PATH } from 'src/main/constants';
 
 import logger from './logger';
 import {
   isAddFileMessage,
+  isCommandOutputMessage,
   isAskQuestionMessage,
   isDropFileMessage,
   isInitMessage,
+  isMemoryTelemetryMessage,
+  isEditBlockMessage,
   isPromptFinishedMessage,
+  isReplayGapMessage,
   isResponseMessage,
+  isSearchModelsMessage,
   isSetModelsMessage,
   isTokensInfoMessage,
   isUpdateAutocompletionMessage,
@@ -23,11 +30,31 @@ import {
   isUseCommandOutputMessage,
   LogMessage,
   Message,
+  ResumeSessionMessage,
 } from './messages';
 
+const isSocketInUse = (socketPath: string): Promise<boolean> => {
+  return new Promise((resolve) => {
+    const client = connect(socketPath);
+    client.once('connect', () => {
+      client.destroy();
+      resolve(true);
+    });
+    client.once('error', () => resolve(false));
+  });
+};
+
+interface ConnectorSession {
+  baseDir: string;
+  lastSeq: number;
+  stateHashes: Record<string, string>;
+}
+
 export class ConnectorManager {
   private io: Server | null = null;
+  private socketIo: Server | null = null;
   private connectors: Connector[] = [];
+  private sessions: Map<string, ConnectorSession> = new Map();
 
   constructor(
     private readonly mainWindow: BrowserWindow,
@@ -39,7 +66,35 @@ export class ConnectorManager {
 
   public init(httpServer: HttpServer): void {
     // Create Socket.IO server
-    this.io = new Server(httpServer, {
+    this.io = this.createSocketServer(httpServer);
+    httpServer.listen(SERVER_PORT);
+
+    if (CONNECTOR_TRANSPORT === 'unix' && SERVER_SOCKET_PATH) {
+      // Unix domain socket for connectors using the unix transport
+      void this.listenOnSocket(SERVER_SOCKET_PATH);
+    }
+
+    logger.info('Socket.IO server initialized');
+  }
+
+  private async listenOnSocket(socketPath: string) {
+    if (existsSync(socketPath)) {
+      if (await isSocketInUse(socketPath)) {
+        logger.error('Unix socket is used by another process, not listening on it', { socketPath });
+        return;
+      }
+      // socket file left by a process that did not exit cleanly
+      unlinkSync(socketPath);
+    }
+
+    const socketServer = createServer();
+    this.socketIo = this.createSocketServer(socketServer);
+    socketServer.on('error', (error) => logger.error('Socket.IO Unix socket server error:', { error }));
+    socketServer.listen(socketPath);
+  }
+
+  private createSocketServer(httpServer: HttpServer): Server {
+    const io = new Server(httpServer, {
       cors: {
         origin: '*',
         methods: ['GET', 'POST'],
@@ -48,10 +103,14 @@ export class ConnectorManager {
       maxHttpBufferSize: 1e8, // Increase payload size to 100 MB
     });
 
-    this.io.on('connection', (socket) => {
+    io.on('connection', (socket) => {
       logger.info('Socket.IO client connected');
 
-      socket.on('message', (message) => this.processMessage(socket, message));
+      socket.on('message', (message, ack?: () => void) => {
+        this.processMessage(socket, message);
+        // the connector waits for the acknowledgement of some messages to not flood the socket
+        ack?.();
+      });
       socket.on('log', (message) => this.processLogMessage(socket, message));
 
       socket.on('disconnect', () => {
@@ -63,15 +122,14 @@ export class ConnectorManager {
       });
     });
 
-    httpServer.listen(SERVER_PORT);
-
-    logger.info('Socket.IO server initialized');
+    return io;
   }
 
   public async close() {
     logger.info('Closing Socket.IO server');
     this.connectors.forEach((connector) => connector.socket.disconnect());
     await this.io?.close();
+    await this.socketIo?.close();
   }
 
   private processMessage = (socket: Socket, message: Message) => {
@@ -85,10 +143,21 @@ export class ConnectorManager {
         logger.info('Initializing connector for base directory:', {
           baseDir: message.baseDir,
           listenTo: message.listenTo,
+          resume: message.resume,
         });
-        const connector = new Connector(socket, message.baseDir, message.listenTo, message.inputHistoryFile);
+        const session = message.sessionId ? this.sessions.get(message.sessionId) : undefined;
+        const connector = new Connector(socket, message.baseDir, message.listenTo, message.inputHistoryFile, message.sessionId, !!session && !!message.resume);
         this.connectors.push(connector);
 
+        if (message.sessionId && !session) {
+          this.sessions.forEach((existingSession, sessionId) => {
+            if (existingSession.baseDir === message.baseDir) {
+              this.sessions.delete(sessionId);
+            }
+          });
+          this.sessions.set(message.sessionId, { baseDir: message.baseDir, lastSeq: 0, stateHashes: {} });
+        }
+
         const project = this.projectManager.getProject(message.baseDir);
         project.addConnector(connector);
 
@@ -96,12 +165,28 @@ export class ConnectorManager {
         logger.info('Socket.IO registered project for base directory:', {
           baseDir: message.baseDir,
         });
+
+        if (message.resume) {
+          const resumeSessionMessage: ResumeSessionMessage = {
+            lastSeq: session ? session.lastSeq : null,
+            stateHashes: session ? session.stateHashes : {},
+          };
+          socket.emit('resume-session', resumeSessionMessage);
+        }
+      } else if (this.isAlreadyReceived(socket, message)) {
+        logger.debug('Skipping already received message', { action: message.action, seq: message.seq });
       } else if (isResponseMessage(message)) {
         const connector = this.findConnectorBySocket(socket);
         if (!connector) {
           return;
         }
         this.projectManager.getProject(connector.baseDir).processResponseMessage(message);
+      } else if (isEditBlockMessage(message)) {
+        const connector = this.findConnectorBySocket(socket);
+        if (!connector) {
+          return;
+        }
+        this.projectManager.getProject(connector.baseDir).processEditBlockMessage(message);
       } else if (isAddFileMessage(message)) {
         const connector = this.findConnectorBySocket(socket);
         if (!connector) {
@@ -126,13 +211,18 @@ export class ConnectorManager {
         }
 
         logger.debug('Updating autocompletion', { baseDir: connector.baseDir });
+        const project = this.projectManager.getProject(connector.baseDir);
+        // the connector only sends the models when they changed
+        if (message.models) {
+          project.setAllModels(message.models);
+        }
         this.mainWindow.webContents.send('update-autocompletion', {
           baseDir: connector.baseDir,
           words: message.words,
           allFiles: message.allFiles,
-          models: message.models,
+          models: project.getUnsentModels(),
         });
-        this.projectManager.getProject(connector.baseDir).setAllTrackedFiles(message.allFiles);
+        project.setAllTrackedFiles(message.allFiles);
       } else if (isAskQuestionMessage(message)) {
         const connector = this.findConnectorBySocket(socket);
         if (!connector) {
@@ -170,11 +260,16 @@ export class ConnectorManager {
           return;
         }
         const project = this.projectManager.getProject(connector.baseDir);
-        if (message.finished) {
-          project.closeCommandOutput();
-        } else {
-          project.openCommandOutput(message.command);
+        project.closeCommandOutput();
+        if (!message.finished) {
+          project.openCommandOutput(message.commandId, message.command);
         }
+      } else if (isCommandOutputMessage(message)) {
+        const connector = this.findConnectorBySocket(socket);
+        if (!connector) {
+          return;
+        }
+        this.projectManager.getProject(connector.baseDir).processCommandOutputMessage(message);
       } else if (isTokensInfoMessage(message)) {
         const connector = this.findConnectorBySocket(socket);
         if (!connector || !this.mainWindow) {
@@ -186,6 +281,18 @@ export class ConnectorManager {
           ...message.info,
         };
         this.projectManager.getProject(connector.baseDir).updateTokensInfo(data);
+      } else if (isSearchModelsMessage(message)) {
+        const connector = this.findConnectorBySocket(socket);
+        if (!connector) {
+          return;
+        }
+        this.projectManager.getProject(connector.baseDir).resolveModelsSearch(message);
+      } else if (isReplayGapMessage(message)) {
+        const connector = this.findConnectorBySocket(socket);
+        if (!connector) {
+          return;
+        }
+        this.projectManager.getProject(connector.baseDir).processReplayGapMessage(message);
       } else if (isPromptFinishedMessage(message)) {
         const connector = this.findConnectorBySocket(socket);
         if (!connector) {
@@ -203,6 +310,15 @@ export class ConnectorManager {
         }
         logger.debug('Updating repo map', { baseDir: connector.baseDir });
         this.projectManager.getProject(connector.baseDir).updateRepoMapFromConnector(message.repoMap);
+      } else if (isMemoryTelemetryMessage(message)) {
+        const connector = this.findConnectorBySocket(socket);
+        if (!connector) {
+          return;
+        }
+        logger.info('Connector memory telemetry', {
+          baseDir: connector.baseDir,
+          telemetry: message.telemetry,
+        });
       } else {
         logger.warn('Unknown message type: ', message);
       }
@@ -213,7 +329,7 @@ export class ConnectorManager {
 
   private processLogMessage = (socket: Socket, message: LogMessage) => {
     const connector = this.findConnectorBySocket(socket);
-    if (!connector || !this.mainWindow) {
+    if (!connector || !this.mainWindow || this.isAlreadyReceived(socket, message)) {
       return;
     }
 
@@ -221,6 +337,26 @@ export class ConnectorManager {
     project.addLogMessage(message.level, message.message, message.finished);
   };
 
+  private isAlreadyReceived = (socket: Socket, message: { action?: string; seq?: number; stateHash?: string }): boolean => {
+    if (message.seq === undefined) {
+      return false;
+    }
+    const sessionId = this.connectors.find((c) => c.socket === socket)?.sessionId;
+    const session = sessionId ? this.sessions.get(sessionId) : undefined;
+    if (!session) {
+      return false;
+    }
+    if (message.seq <= session.lastSeq) {
+      return true;
+    }
+
+    session.lastSeq = message.seq;
+    if (message.action && message.stateHash) {
+      session.stateHashes[message.action] = message.stateHash;
+    }
+    return false;
+  };
+
   private removeConnector = (socket: Socket) => {
     const connector = this.findConnectorBySocket(socket);
     if (!connector) {
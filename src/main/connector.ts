@@ -15,6 +15,7 @@ import {
   MessageAction,
   PromptMessage,
   RunCommandMessage,
+  SearchModelsMessage,
   SetModelsMessage,
 } from './messages';
 
@@ -23,12 +24,16 @@ export class Connector {
   baseDir: string;
   listenTo: MessageAction[];
   inputHistoryFile?: string;
+  sessionId?: string;
+  resumed: boolean;
 
-  constructor(socket: Socket, baseDir: string, listenTo: MessageAction[] = [], inputHistoryFile?: string) {
+  constructor(socket: Socket, baseDir: string, listenTo: MessageAction[] = [], inputHistoryFile?: string, sessionId?: string, resumed = false) {
     this.socket = socket;
     this.baseDir = baseDir;
     this.listenTo = listenTo;
     this.inputHistoryFile = inputHistoryFile;
+    this.sessionId = sessionId;
+    this.resumed = resumed;
   }
 
   private sendMessage = (message: Message) => {
@@ -132,4 +137,14 @@ export class Connector {
     };
     this.sendMessage(message);
   }
+
+  public sendSearchModelsMessage(requestId: string, query: string, limit?: number) {
+    const message: SearchModelsMessage = {
+      action: 'search-models',
+      requestId,
+      query,
+      limit,
+    };
+    this.sendMessage(message);
+  }
 }
@@ -16,4 +16,7 @@ export const PYTHON_COMMAND = process.platform === 'win32' ? path.join(PYTHON_VE
 export const AIDER_DESK_CONNECTOR_DIR = path.join(AIDER_DESK_DIR, 'aider-connector');
 export const AIDER_DESK_MCP_SERVER_DIR = path.join(AIDER_DESK_DIR, 'mcp-server');
 export const SERVER_PORT = process.env.AIDER_DESK_PORT ? parseInt(process.env.AIDER_DESK_PORT) : 24337;
+// one socket per instance, several AiderDesk instances can run at once
+export const SERVER_SOCKET_PATH = process.platform === 'win32' ? null : path.join(AIDER_DESK_DIR, `connector-${process.pid}.sock`);
+export const CONNECTOR_TRANSPORT = process.env.AIDER_DESK_CONNECTOR_TRANSPORT || 'websocket';
 export const PID_FILES_DIR = path.join(AIDER_DESK_DIR, 'aider-processes');
@@ -148,6 +148,10 @@ export const setupIpcHandlers = (
     return projectManager.getProject(baseDir).getAddableFiles();
   });
 
+  ipcMain.handle('search-models', async (_, baseDir: string, query: string, limit?: number) => {
+    return projectManager.getProject(baseDir).searchModels(query, limit);
+  });
+
   ipcMain.handle('is-project-path', async (_, path: string) => {
     return isProjectPath(path);
   });
@@ -9,6 +9,8 @@ import {
   MessageRole,
   RawModelInfo,
   EditFormat,
+  EditBlockFormat,
+  EditBlockSection,
 } from '@common/types';
 
 export type MessageAction =
@@ -24,21 +26,32 @@ export type MessageAction =
   | 'set-models'
   | 'update-context-files'
   | 'use-command-output'
+  | 'command-output'
   | 'run-command'
   | 'tokens-info'
   | 'add-message'
   | 'interrupt-response'
   | 'apply-edits'
-  | 'update-repo-map';
+  | 'update-repo-map'
+  | 'memory-telemetry'
+  | 'profile'
+  | 'edit-block-start'
+  | 'edit-block-delta'
+  | 'edit-block-end'
+  | 'replay-gap'
+  | 'search-models';
 
 export interface Message {
   action: MessageAction;
+  seq?: number;
+  stateHash?: string;
 }
 
 export interface LogMessage {
   message: string;
   level: LogLevel;
   finished?: boolean;
+  seq?: number;
 }
 
 export interface InitMessage {
@@ -47,6 +60,13 @@ export interface InitMessage {
   contextFiles?: ContextFile[];
   listenTo?: MessageAction[];
   inputHistoryFile?: string;
+  sessionId?: string;
+  resume?: boolean;
+}
+
+export interface ResumeSessionMessage {
+  lastSeq: number | null;
+  stateHashes: Record<string, string>;
 }
 
 export const isInitMessage = (message: Message): message is InitMessage => {
@@ -73,12 +93,30 @@ export interface ResponseMessage extends Message {
   commitHash?: string;
   commitMessage?: string;
   diff?: string;
+  editorLatency?: {
+    afterConfirmMs: number;
+    afterArchitectMs?: number;
+  };
 }
 
 export const isResponseMessage = (message: Message): message is ResponseMessage => {
   return typeof message === 'object' && message !== null && 'action' in message && message.action === 'response';
 };
 
+export interface EditBlockMessage extends Message {
+  action: 'edit-block-start' | 'edit-block-delta' | 'edit-block-end';
+  blockId: number;
+  path?: string;
+  format?: EditBlockFormat;
+  section?: EditBlockSection;
+  content?: string;
+  complete?: boolean;
+}
+
+export const isEditBlockMessage = (message: Message): message is EditBlockMessage => {
+  return message.action === 'edit-block-start' || message.action === 'edit-block-delta' || message.action === 'edit-block-end';
+};
+
 export interface AddFileMessage extends Message {
   action: 'add-file';
   path: string;
@@ -111,7 +149,7 @@ export interface UpdateAutocompletionMessage extends Message {
   action: 'update-autocompletion';
   words: string[];
   allFiles: string[];
-  models: string[];
+  models?: string[];
 }
 
 export const isUpdateAutocompletionMessage = (message: Message): message is UpdateAutocompletionMessage => {
@@ -159,6 +197,7 @@ export const isUpdateContextFilesMessage = (message: Message): message is Update
 export interface UseCommandOutputMessage extends Message {
   action: 'use-command-output';
   command: string;
+  commandId: string;
   finished: boolean;
 }
 
@@ -166,6 +205,20 @@ export const isUseCommandOutputMessage = (message: Message): message is UseComma
   return typeof message === 'object' && message !== null && 'action' in message && message.action === 'use-command-output';
 };
 
+export interface CommandOutputMessage extends Message {
+  action: 'command-output';
+  commandId: string;
+  command: string;
+  output: string;
+  finished: boolean;
+  exitCode?: number;
+  truncated?: boolean;
+}
+
+export const isCommandOutputMessage = (message: Message): message is CommandOutputMessage => {
+  return message.action === 'command-output';
+};
+
 export interface TokensInfoMessage extends Message {
   action: 'tokens-info';
   info: {
@@ -205,6 +258,18 @@ export interface ApplyEditsMessage extends Message {
   edits: FileEdit[];
 }
 
+export interface SearchModelsMessage extends Message {
+  action: 'search-models';
+  requestId: string | null;
+  query: string;
+  limit?: number;
+  models?: string[];
+}
+
+export const isSearchModelsMessage = (message: Message): message is SearchModelsMessage => {
+  return message.action === 'search-models';
+};
+
 export interface UpdateRepoMapMessage extends Message {
   action: 'update-repo-map';
   repoMap: string;
@@ -213,3 +278,41 @@ export interface UpdateRepoMapMessage extends Message {
 export const isUpdateRepoMapMessage = (message: Message): message is UpdateRepoMapMessage => {
   return message.action === 'update-repo-map';
 };
+
+export interface MemoryTelemetryMessage extends Message {
+  action: 'memory-telemetry';
+  telemetry: {
+    rss: number;
+    messages: {
+      count: number;
+      size: number;
+      tokens: number;
+    };
+    caches: Record<string, number>;
+    fileListing: {
+      hits: number;
+      misses: number;
+    };
+    allocations: { location: string; size: number; count: number }[] | null;
+  };
+}
+
+export const isMemoryTelemetryMessage = (message: Message): message is MemoryTelemetryMessage => {
+  return message.action === 'memory-telemetry';
+};
+
+export interface ReplayGapMessage extends Message {
+  action: 'replay-gap';
+  lastSeq: number;
+  lostSeq: number;
+}
+
+export const isReplayGapMessage = (message: Message): message is ReplayGapMessage => {
+  return message.action === 'replay-gap';
+};
+
+export interface ProfileMessage extends Message {
+  action: 'profile';
+  command: 'start' | 'stop';
+  top?: number;
+}
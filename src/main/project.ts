@@ -7,7 +7,9 @@ import path from 'path';
 import { simpleGit } from 'simple-git';
 import { BrowserWindow, dialog, Notification } from 'electron';
 import {
+  CommandOutputData,
   ContextFile,
+  EditBlockData,
   EditFormat,
   FileEdit,
   InputHistoryData,
@@ -38,21 +40,25 @@ import { TaskManager } from './task-manager';
 import { SessionManager } from './session-manager';
 import { Agent } from './agent';
 import { Connector } from './connector';
-import { AIDER_DESK_CONNECTOR_DIR, PID_FILES_DIR, PYTHON_COMMAND, SERVER_PORT } from './constants';
+import { AIDER_DESK_CONNECTOR_DIR, CONNECTOR_TRANSPORT, PID_FILES_DIR, PYTHON_COMMAND, SERVER_PORT, SERVER_SOCKET_PATH } from './constants';
 import logger from './logger';
-import { MessageAction, ResponseMessage } from './messages';
+import { CommandOutputMessage, EditBlockMessage, MessageAction, ReplayGapMessage, ResponseMessage, SearchModelsMessage } from './messages';
 import { DEFAULT_MAIN_MODEL, Store } from './store';
 
 import type { SimpleGit } from 'simple-git';
 
+const AIDER_TERMINATE_TIMEOUT_MS = 3000;
+
 export class Project {
   private process: ChildProcessWithoutNullStreams | null = null;
   private connectors: Connector[] = [];
-  private currentCommand: string | null = null;
+  private currentCommandId: string | null = null;
   private currentQuestion: QuestionData | null = null;
   private currentQuestionResolves: ((answer: [string, string | undefined]) => void)[] = [];
   private questionAnswers: Map<string, 'y' | 'n'> = new Map();
   private allTrackedFiles: string[] = [];
+  private allModels: string[] = [];
+  private allModelsSent = false;
   private currentResponseMessageId: string | null = null;
   private currentPromptId: string | null = null;
   private inputHistoryFile = '.aider.input.history';
@@ -60,9 +66,10 @@ export class Project {
   private tokensInfo: TokensInfoData;
   private currentPromptResponses: ResponseCompletedData[] = [];
   private runPromptResolves: ((value: ResponseCompletedData[]) => void)[] = [];
+  private modelsSearchResolves: Map<string, (models: string[]) => void> = new Map();
   private sessionManager: SessionManager = new SessionManager(this);
   private taskManager: TaskManager = new TaskManager();
-  private commandOutputs: Map<string, string> = new Map();
+  private commandOutputs: Map<string, { command: string; output: string }> = new Map();
   private repoMap: string = '';
 
   aiderTotalCost: number = 0;
@@ -122,10 +129,11 @@ export class Project {
     this.aiderTotalCost = 0;
     this.currentPromptId = null;
     this.currentResponseMessageId = null;
-    this.currentCommand = null;
+    this.currentCommandId = null;
     this.currentQuestion = null;
     this.currentQuestionResolves = [];
     this.questionAnswers.clear();
+    this.allModelsSent = false;
 
     await this.updateAgentEstimatedTokens();
   }
@@ -135,6 +143,10 @@ export class Project {
       baseDir: this.baseDir,
     });
     this.connectors.push(connector);
+    if (connector.resumed) {
+      // connector process kept its state, it only needs to catch up on missed messages
+      return;
+    }
     if (connector.listenTo.includes('add-file')) {
       const contextFiles = this.sessionManager.getContextFiles();
       for (let index = 0; index < contextFiles.length; index++) {
@@ -285,6 +297,8 @@ export class Project {
       ...environmentVariables,
       PYTHONPATH: AIDER_DESK_CONNECTOR_DIR,
       CONNECTOR_SERVER_URL: `http://localhost:${SERVER_PORT}`,
+      CONNECTOR_TRANSPORT,
+      ...(CONNECTOR_TRANSPORT === 'unix' && SERVER_SOCKET_PATH ? { CONNECTOR_SERVER_SOCKET: SERVER_SOCKET_PATH } : {}),
     };
 
     // Spawn without shell to have direct process control
@@ -298,10 +312,6 @@ export class Project {
     this.process.stdout.on('data', (data) => {
       const output = data.toString();
       logger.debug('Aider output:', { output });
-
-      if (this.currentCommand) {
-        this.addCommandOutput(this.currentCommand, output);
-      }
     });
 
     this.process.stderr.on('data', (data) => {
@@ -379,19 +389,23 @@ export class Project {
     if (this.process) {
       logger.info('Killing Aider...', { baseDir: this.baseDir });
       try {
-        await new Promise<void>((resolve, reject) => {
-          treeKill(this.process!.pid!, 'SIGKILL', (err) => {
-            if (err) {
-              logger.error('Error killing Aider process:', { error: err });
-              reject(err);
-            } else {
-              this.removeAiderProcessPidFile();
-              resolve();
-            }
+        if (await this.terminateAider(this.process)) {
+          this.removeAiderProcessPidFile();
+        } else {
+          await new Promise<void>((resolve, reject) => {
+            treeKill(this.process!.pid!, 'SIGKILL', (err) => {
+              if (err) {
+                logger.error('Error killing Aider process:', { error: err });
+                reject(err);
+              } else {
+                this.removeAiderProcessPidFile();
+                resolve();
+              }
+            });
           });
-        });
+        }
 
-        this.currentCommand = null;
+        this.currentCommandId = null;
         this.currentQuestion = null;
         this.currentResponseMessageId = null;
         this.currentPromptId = null;
@@ -410,6 +424,23 @@ export class Project {
     }
   }
 
+  private async terminateAider(aiderProcess: ChildProcessWithoutNullStreams): Promise<boolean> {
+    const hasExited = () => aiderProcess.exitCode !== null || aiderProcess.signalCode !== null;
+    if (hasExited()) {
+      return true;
+    }
+
+    // SIGTERM first so the connector can write its --profile results, killed when it does not exit in time
+    const exited = new Promise<void>((resolve) => aiderProcess.once('exit', () => resolve()));
+    treeKill(aiderProcess.pid!, 'SIGTERM', (err) => {
+      if (err) {
+        logger.warn('Error terminating Aider process:', { error: err });
+      }
+    });
+    await Promise.race([exited, new Promise<void>((resolve) => setTimeout(resolve, AIDER_TERMINATE_TIMEOUT_MS))]);
+    return hasExited();
+  }
+
   private findMessageConnectors(action: MessageAction): Connector[] {
     return this.connectors.filter((connector) => connector.listenTo.includes(action));
   }
@@ -546,6 +577,9 @@ export class Project {
         logger.info(`Usage report: ${JSON.stringify(usageReport)}`);
         this.updateTotalCosts(usageReport);
       }
+      if (message.editorLatency) {
+        logger.info('Editor latency:', { baseDir: this.baseDir, ...message.editorLatency });
+      }
       const data: ResponseCompletedData = {
         messageId: message.id || this.currentResponseMessageId,
         content: message.content,
@@ -569,6 +603,39 @@ export class Project {
     return this.currentResponseMessageId;
   }
 
+  public processEditBlockMessage(message: EditBlockMessage) {
+    if (!this.currentResponseMessageId) {
+      this.currentResponseMessageId = uuidv4();
+    }
+
+    const data: EditBlockData = {
+      messageId: this.currentResponseMessageId,
+      baseDir: this.baseDir,
+      event: message.action === 'edit-block-start' ? 'start' : message.action === 'edit-block-delta' ? 'delta' : 'end',
+      blockId: message.blockId,
+      path: message.path,
+      format: message.format,
+      section: message.section,
+      content: message.content,
+      complete: message.complete,
+    };
+    this.mainWindow.webContents.send('edit-block', data);
+  }
+
+  public processReplayGapMessage(message: ReplayGapMessage) {
+    logger.warn('Connector messages were lost while reconnecting', {
+      baseDir: this.baseDir,
+      lastSeq: message.lastSeq,
+      lostSeq: message.lostSeq,
+    });
+    this.addLogMessage(
+      'warning',
+      this.currentResponseMessageId
+        ? 'Part of the response was lost while reconnecting to Aider, it may be incomplete.'
+        : 'Some messages from Aider were lost while reconnecting.',
+    );
+  }
+
   addResponseCompletedMessage(data: ResponseCompletedData) {
     this.mainWindow.webContents.send('response-completed', data);
   }
@@ -823,6 +890,20 @@ export class Project {
     this.allTrackedFiles = files;
   }
 
+  public setAllModels(models: string[]) {
+    this.allModels = models;
+    this.allModelsSent = false;
+  }
+
+  // the renderer gets the model list only when it changed, it searches the models through searchModels
+  public getUnsentModels(): string[] | undefined {
+    if (this.allModelsSent) {
+      return undefined;
+    }
+    this.allModelsSent = true;
+    return this.allModels;
+  }
+
   public updateAiderModels(modelsData: ModelsData) {
     const currentSettings = this.store.getProjectSettings(this.baseDir);
     const updatedSettings: ProjectSettings = {
@@ -858,6 +939,37 @@ export class Project {
     });
   }
 
+  public searchModels(query: string, limit?: number): Promise<string[]> {
+    const connector = this.findMessageConnectors('search-models')[0];
+    if (!connector) {
+      return Promise.resolve([]);
+    }
+
+    const requestId = uuidv4();
+    return new Promise((resolve) => {
+      const timeout = setTimeout(() => {
+        this.modelsSearchResolves.delete(requestId);
+        resolve([]);
+      }, 5000);
+      this.modelsSearchResolves.set(requestId, (models) => {
+        clearTimeout(timeout);
+        resolve(models);
+      });
+      connector.sendSearchModelsMessage(requestId, query, limit);
+    });
+  }
+
+  public resolveModelsSearch(message: SearchModelsMessage) {
+    if (!message.requestId) {
+      return;
+    }
+    const resolve = this.modelsSearchResolves.get(message.requestId);
+    if (resolve) {
+      this.modelsSearchResolves.delete(message.requestId);
+      resolve(message.models || []);
+    }
+  }
+
   public getAddableFiles(searchRegex?: string): string[] {
     const contextFilePaths = new Set(this.getContextFiles().map((file) => file.path));
     let files = this.allTrackedFiles.filter((file) => !contextFilePaths.has(file));
@@ -893,36 +1005,65 @@ export class Project {
     this.setRepoMap(repoMap);
   }
 
-  public openCommandOutput(command: string) {
-    this.currentCommand = command;
-    this.commandOutputs.set(command, '');
-    this.addCommandOutput(command, '');
+  public openCommandOutput(commandId: string, command: string) {
+    this.currentCommandId = commandId;
+    this.commandOutputs.set(commandId, { command, output: '' });
+    this.addCommandOutput(commandId, '');
   }
 
   public closeCommandOutput() {
-    if (!this.currentCommand) {
+    if (!this.currentCommandId) {
       return;
     }
-    const command = this.currentCommand;
-    const output = this.commandOutputs.get(command);
-    if (output && output.trim()) {
+    const commandOutput = this.commandOutputs.get(this.currentCommandId);
+    if (commandOutput && commandOutput.output.trim()) {
       // Add the command output to the session manager as an assistant message, prepending the command
-      this.sessionManager.addContextMessage(MessageRole.Assistant, `${command}\n\n${output}`);
+      this.sessionManager.addContextMessage(MessageRole.Assistant, `${commandOutput.command}\n\n${commandOutput.output}`);
     }
-    this.commandOutputs.delete(command);
-    this.currentCommand = null;
+    this.commandOutputs.delete(this.currentCommandId);
+    this.currentCommandId = null;
   }
 
-  private addCommandOutput(command: string, output: string) {
+  public processCommandOutputMessage(message: CommandOutputMessage) {
+    if (!this.commandOutputs.has(message.commandId)) {
+      this.closeCommandOutput();
+      this.openCommandOutput(message.commandId, message.command);
+    }
+
+    if (message.finished) {
+      logger.info('Command finished', {
+        baseDir: this.baseDir,
+        command: message.command,
+        exitCode: message.exitCode,
+        truncated: message.truncated,
+      });
+      this.addCommandOutput(message.commandId, message.output, true, message.exitCode);
+      if (this.currentCommandId === message.commandId) {
+        this.closeCommandOutput();
+      }
+      return;
+    }
+
+    this.addCommandOutput(message.commandId, message.output);
+  }
+
+  private addCommandOutput(commandId: string, output: string, finished = false, exitCode?: number) {
+    const commandOutput = this.commandOutputs.get(commandId);
+    if (!commandOutput) {
+      return;
+    }
     // Append output to the commandOutputs map
-    const prev = this.commandOutputs.get(command) || '';
-    this.commandOutputs.set(command, prev + output);
+    commandOutput.output += output;
 
-    this.mainWindow.webContents.send('command-output', {
+    const data: CommandOutputData = {
       baseDir: this.baseDir,
-      command,
+      commandId,
+      command: commandOutput.command,
       output,
-    });
+      finished,
+      exitCode,
+    };
+    this.mainWindow.webContents.send('command-output', data);
   }
 
   public addLogMessage(level: LogLevel, message?: string, finished = false) {
@@ -9,6 +9,7 @@ import type {
   QuestionData,
   ResponseChunkData,
   ResponseCompletedData,
+  EditBlockData,
   SessionData,
   SettingsData,
   TokensInfoData,
@@ -48,6 +49,7 @@ export interface ApplicationAPI {
   patchProjectSettings: (baseDir: string, settings: Partial<ProjectSettings>) => Promise<ProjectSettings>;
   getFilePathSuggestions: (currentPath: string, directoriesOnly?: boolean) => Promise<string[]>;
   getAddableFiles: (baseDir: string) => Promise<string[]>;
+  searchModels: (baseDir: string, query: string, limit?: number) => Promise<string[]>;
   addFile: (baseDir: string, filePath: string, readOnly?: boolean) => void;
   isValidPath: (baseDir: string, path: string) => Promise<boolean>;
   isProjectPath: (path: string) => Promise<boolean>;
@@ -82,6 +84,8 @@ export interface ApplicationAPI {
 
   addResponseChunkListener: (baseDir: string, callback: (event: Electron.IpcRendererEvent, data: ResponseChunkData) => void) => string;
   removeResponseChunkListener: (listenerId: string) => void;
+  addEditBlockListener: (baseDir: string, callback: (event: Electron.IpcRendererEvent, data: EditBlockData) => void) => string;
+  removeEditBlockListener: (listenerId: string) => void;
 
   addResponseCompletedListener: (baseDir: string, callback: (event: Electron.IpcRendererEvent, data: ResponseCompletedData) => void) => string;
   removeResponseCompletedListener: (listenerId: string) => void;
@@ -2,6 +2,7 @@ import {
   AutocompletionData,
   CommandOutputData,
   ContextFile,
+  EditBlockData,
   ContextFilesUpdatedData,
   FileEdit,
   InputHistoryData,
@@ -37,6 +38,7 @@ const updateAiderModelsListeners: Record<string, (event: Electron.IpcRendererEve
 const commandOutputListeners: Record<string, (event: Electron.IpcRendererEvent, data: CommandOutputData) => void> = {};
 const logListeners: Record<string, (event: Electron.IpcRendererEvent, data: LogData) => void> = {};
 const tokensInfoListeners: Record<string, (event: Electron.IpcRendererEvent, data: TokensInfoData) => void> = {};
+const editBlockListeners: Record<string, (event: Electron.IpcRendererEvent, data: EditBlockData) => void> = {};
 const toolListeners: Record<string, (event: Electron.IpcRendererEvent, data: ToolData) => void> = {};
 const inputHistoryUpdatedListeners: Record<string, (event: Electron.IpcRendererEvent, data: InputHistoryData) => void> = {};
 const userMessageListeners: Record<string, (event: Electron.IpcRendererEvent, data: UserMessageData) => void> = {};
@@ -68,6 +70,7 @@ const api: ApplicationAPI = {
   patchProjectSettings: (baseDir, settings) => ipcRenderer.invoke('patch-project-settings', baseDir, settings),
   getFilePathSuggestions: (currentPath, directoriesOnly = false) => ipcRenderer.invoke('get-file-path-suggestions', currentPath, directoriesOnly),
   getAddableFiles: (baseDir) => ipcRenderer.invoke('get-addable-files', baseDir),
+  searchModels: (baseDir, query, limit) => ipcRenderer.invoke('search-models', baseDir, query, limit),
   addFile: (baseDir, filePath, readOnly = false) => ipcRenderer.send('add-file', baseDir, filePath, readOnly),
   isValidPath: (baseDir, path) => ipcRenderer.invoke('is-valid-path', baseDir, path),
   isProjectPath: (path) => ipcRenderer.invoke('is-project-path', path),
@@ -118,6 +121,25 @@ const api: ApplicationAPI = {
     }
   },
 
+  addEditBlockListener: (baseDir, callback) => {
+    const listenerId = uuidv4();
+    editBlockListeners[listenerId] = (event: Electron.IpcRendererEvent, data: EditBlockData) => {
+      if (!compareBaseDirs(data.baseDir, baseDir)) {
+        return;
+      }
+      callback(event, data);
+    };
+    ipcRenderer.on('edit-block', editBlockListeners[listenerId]);
+    return listenerId;
+  },
+  removeEditBlockListener: (listenerId) => {
+    const callback = editBlockListeners[listenerId];
+    if (callback) {
+      ipcRenderer.removeListener('edit-block', callback);
+      delete editBlockListeners[listenerId];
+    }
+  },
+
   addResponseCompletedListener: (baseDir, callback) => {
     const listenerId = uuidv4();
     responseFinishedListeners[listenerId] = (event: Electron.IpcRendererEvent, data: ResponseCompletedData) => {
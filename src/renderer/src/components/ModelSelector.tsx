@@ -12,16 +12,18 @@ export type ModelSelectorRef = {
 };
 
 type Props = {
+  baseDir: string;
   models: string[];
   selectedModel?: string;
   onChange: (model: string) => void;
 };
 
-export const ModelSelector = forwardRef<ModelSelectorRef, Props>(({ models, selectedModel, onChange }, ref) => {
+export const ModelSelector = forwardRef<ModelSelectorRef, Props>(({ baseDir, models, selectedModel, onChange }, ref) => {
   const { t } = useTranslation();
   const { settings, saveSettings } = useSettings();
   const [modelSearchTerm, setModelSearchTerm] = useState('');
   const [debouncedSearchTerm, setDebouncedSearchTerm] = useState('');
+  const [searchedModels, setSearchedModels] = useState<string[]>([]);
   const [highlightedModelIndex, setHighlightedModelIndex] = useState(-1);
   const [visible, show, hide] = useBooleanState(false);
   const modelSelectorRef = useRef<HTMLDivElement>(null);
@@ -35,6 +37,25 @@ export const ModelSelector = forwardRef<ModelSelectorRef, Props>(({ models, sele
     [modelSearchTerm],
   );
 
+  useEffect(() => {
+    if (!debouncedSearchTerm) {
+      setSearchedModels([]);
+      return;
+    }
+
+    // the model list is searched in the connector, it holds an index of all the model names
+    let cancelled = false;
+    void window.api.searchModels(baseDir, debouncedSearchTerm).then((results) => {
+      if (!cancelled) {
+        setSearchedModels(results);
+      }
+    });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [baseDir, debouncedSearchTerm]);
+
   useClickOutside(modelSelectorRef, hide);
 
   useEffect(() => {
@@ -66,9 +87,9 @@ export const ModelSelector = forwardRef<ModelSelectorRef, Props>(({ models, sele
       return;
     }
 
-    const visiblePreferredModels = debouncedSearchTerm ? [] : settings.models.preferred;
-    const sortedModels = [...visiblePreferredModels, ...models.filter((model) => !visiblePreferredModels.includes(model))];
-    const filteredModels = sortedModels.filter((model) => model.toLowerCase().includes(debouncedSearchTerm.toLowerCase()));
+    const filteredModels = debouncedSearchTerm
+      ? searchedModels
+      : [...settings.models.preferred, ...models.filter((model) => !settings.models.preferred.includes(model))];
 
     switch (e.key) {
       case 'ArrowDown':
@@ -105,7 +126,7 @@ export const ModelSelector = forwardRef<ModelSelectorRef, Props>(({ models, sele
     }
   };
 
-  const filteredModels = models.filter((model) => model.toLowerCase().includes(debouncedSearchTerm.toLowerCase()));
+  const filteredModels = debouncedSearchTerm ? searchedModels : models;
   const showCustomModelHint = filteredModels.length === 0 && modelSearchTerm.trim() !== '';
 
   const renderModelItem = (model: string, index: number) => {
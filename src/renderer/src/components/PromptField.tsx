@@ -19,6 +19,8 @@ const CONFIRM_COMMANDS = [
   '/test',
   '/map-refresh',
   '/map',
+  '/memory',
+  '/profile',
   '/run',
   '/reasoning-effort',
   '/think-tokens',
@@ -1,3 +1,4 @@
+import clsx from 'clsx';
 import { BiTerminal } from 'react-icons/bi';
 import { useTranslation } from 'react-i18next';
 
@@ -23,6 +24,11 @@ export const CommandOutputMessageBlock = ({ message }: Props) => {
             <span className="text-neutral-400">{message.command}</span>
           </div>
         </div>
+        {message.finished && message.exitCode !== undefined && (
+          <span className={clsx('text-xs', message.exitCode === 0 ? 'text-neutral-500' : 'text-red-400')}>
+            {t('commandOutput.exitCode', { exitCode: message.exitCode })}
+          </span>
+        )}
       </div>
       {message.content && <div className="mt-2 p-2 bg-gray-950 border border-neutral-800 text-xs whitespace-pre-wrap">{message.content}</div>}
       <div className="absolute top-2 right-2">
@@ -1,10 +1,56 @@
 import clsx from 'clsx';
+import { ReactNode } from 'react';
 import { RiRobot2Line } from 'react-icons/ri';
 
+import { CodeBlock } from './CodeBlock';
 import { MessageBar } from './MessageBar';
 
 import { useParsedContent } from '@/hooks/useParsedContent';
-import { ResponseMessage } from '@/types/message';
+import { EditBlock, ResponseMessage } from '@/types/message';
+
+const FENCE_LINE = /^(```|<source>|<code>|<pre>|<codeblock>|<sourcecode>)/;
+const CLOSING_FENCE_LINE = /^(```|<\/source>|<\/code>|<\/pre>|<\/codeblock>|<\/sourcecode>)\s*$/;
+
+/**
+ * Returns the text following an edit block without the fence closing it.
+ */
+const getTextAfterEditBlock = (text: string) => {
+  const lineEnd = text.indexOf('\n');
+  const firstLine = lineEnd === -1 ? text : text.slice(0, lineEnd);
+  return CLOSING_FENCE_LINE.test(firstLine) ? text.slice(firstLine.length + 1) : text;
+};
+
+/**
+ * Returns the text of the message written between textStart and the edit block, without the lines
+ * opening the block (file name, fence and the SEARCH marker) as those are rendered from the events.
+ */
+const getTextBeforeEditBlock = (content: string, textStart: number, editBlock: EditBlock) => {
+  const lines = getTextAfterEditBlock(content.slice(textStart, editBlock.textOffset)).split('\n');
+  const fenceIndex = lines.findLastIndex((line) => FENCE_LINE.test(line));
+  if (fenceIndex !== -1) {
+    lines.splice(editBlock.path && fenceIndex > 0 && lines[fenceIndex - 1].trim().endsWith(editBlock.path) ? fenceIndex - 1 : fenceIndex);
+  } else {
+    lines.splice(Math.max(0, lines.length - 3));
+  }
+  return lines.join('\n');
+};
+
+const getLanguage = (path?: string) => {
+  return path?.split('.').pop() ?? '';
+};
+
+type TextSegmentProps = {
+  baseDir: string;
+  content: string;
+  allFiles: string[];
+  renderMarkdown: boolean;
+};
+
+// the text between the blocks does not change anymore once the next block started, so it is parsed only once
+const TextSegment = ({ baseDir, content, allFiles, renderMarkdown }: TextSegmentProps) => {
+  const parsedContent = useParsedContent(baseDir, content, allFiles, renderMarkdown);
+  return <>{parsedContent}</>;
+};
 
 type Props = {
   baseDir: string;
@@ -17,7 +63,63 @@ type Props = {
 export const ResponseMessageBlock = ({ baseDir, message, allFiles, renderMarkdown, onRemove }: Props) => {
   const baseClasses = 'rounded-md p-3 mb-2 max-w-full text-xs bg-neutral-850 border border-neutral-800 text-gray-100';
 
-  const parsedContent = useParsedContent(baseDir, message.content, allFiles, renderMarkdown);
+  // while streaming, the edit blocks are built from the edit block events so the growing text is not re-parsed on every chunk
+  const streamingEditBlocks = message.processing && message.editBlocks?.length ? message.editBlocks : null;
+  const parsedContent = useParsedContent(baseDir, streamingEditBlocks ? null : message.content, allFiles, renderMarkdown);
+
+  const renderStreamingContent = (editBlocks: EditBlock[]) => {
+    const parts: ReactNode[] = [];
+    let textStart = 0;
+    let tailStart: number | undefined = 0;
+
+    for (const editBlock of editBlocks) {
+      parts.push(
+        <TextSegment
+          key={`text-${editBlock.id}`}
+          baseDir={baseDir}
+          content={getTextBeforeEditBlock(message.content, textStart, editBlock)}
+          allFiles={allFiles}
+          renderMarkdown={renderMarkdown}
+        />,
+      );
+      parts.push(
+        editBlock.format === 'editblock' ? (
+          <CodeBlock
+            key={`block-${editBlock.id}`}
+            baseDir={baseDir}
+            language={getLanguage(editBlock.path)}
+            file={editBlock.path}
+            isComplete={editBlock.finished}
+            oldValue={editBlock.search}
+            newValue={editBlock.replace}
+          />
+        ) : (
+          <CodeBlock key={`block-${editBlock.id}`} baseDir={baseDir} language={getLanguage(editBlock.path)} file={editBlock.path} isComplete={editBlock.finished}>
+            {editBlock.content}
+          </CodeBlock>
+        ),
+      );
+      tailStart = editBlock.endOffset;
+      if (tailStart === undefined) {
+        break;
+      }
+      textStart = tailStart;
+    }
+
+    if (tailStart !== undefined) {
+      // the text after the last block is still growing, it is shown unparsed until the next block or the end of the response
+      const tail = getTextAfterEditBlock(message.content.slice(tailStart));
+      if (tail.trim()) {
+        parts.push(
+          <div key="tail" className="whitespace-pre-wrap">
+            {tail}
+          </div>,
+        );
+      }
+    }
+
+    return parts;
+  };
 
   if (!message.content) {
     return null;
@@ -29,7 +131,7 @@ export const ResponseMessageBlock = ({ baseDir, message, allFiles, renderMarkdow
         <div className="mt-[1px]">
           <RiRobot2Line className="text-neutral-500 w-4 h-4" />
         </div>
-        <div className="flex-grow-1 w-full overflow-hidden">{parsedContent}</div>
+        <div className="flex-grow-1 w-full overflow-hidden">{streamingEditBlocks ? renderStreamingContent(streamingEditBlocks) : parsedContent}</div>
       </div>
       <MessageBar content={message.content} usageReport={message.usageReport} remove={onRemove} />
     </div>
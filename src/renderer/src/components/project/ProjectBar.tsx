@@ -277,6 +277,7 @@ export const ProjectBar = React.forwardRef<ProjectTopBarRef, Props>(
                           <StyledTooltip id="architect-model-tooltip" />
                           <ModelSelector
                             ref={architectModelSelectorRef}
+                            baseDir={baseDir}
                             models={allModels}
                             selectedModel={modelsData.architectModel || modelsData.mainModel}
                             onChange={updateArchitectModel}
@@ -293,13 +294,13 @@ export const ProjectBar = React.forwardRef<ProjectTopBarRef, Props>(
                   id="main-model-tooltip"
                   content={renderModelInfo(t(mode === 'architect' ? 'modelSelector.editorModel' : 'modelSelector.mainModel'), modelsData.info)}
                 />
-                <ModelSelector ref={mainModelSelectorRef} models={allModels} selectedModel={modelsData.mainModel} onChange={updateMainModel} />
+                <ModelSelector ref={mainModelSelectorRef} baseDir={baseDir} models={allModels} selectedModel={modelsData.mainModel} onChange={updateMainModel} />
               </div>
               <div className="h-3 w-px bg-neutral-600/50"></div>
               <div className="flex items-center space-x-1">
                 <BsFilter className="w-4 h-4 text-neutral-100 mr-1" data-tooltip-id="weak-model-tooltip" data-tooltip-content={t('modelSelector.weakModel')} />
                 <StyledTooltip id="weak-model-tooltip" />
-                <ModelSelector models={allModels} selectedModel={modelsData.weakModel || modelsData.mainModel} onChange={updateWeakModel} />
+                <ModelSelector baseDir={baseDir} models={allModels} selectedModel={modelsData.weakModel || modelsData.mainModel} onChange={updateWeakModel} />
               </div>
               {modelsData.editFormat && (
                 <>
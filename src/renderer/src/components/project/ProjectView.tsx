@@ -1,6 +1,7 @@
 import {
   AutocompletionData,
   CommandOutputData,
+  EditBlockData,
   InputHistoryData,
   LogData,
   Mode,
@@ -24,6 +25,7 @@ import clsx from 'clsx';
 
 import {
   CommandOutputMessage,
+  EditBlock,
   isCommandOutputMessage,
   isLoadingMessage,
   isResponseMessage,
@@ -209,22 +211,64 @@ export const ProjectView = ({ project, isActive = false }: Props) => {
       setProcessing(false);
     };
 
-    const handleCommandOutput = (_: IpcRendererEvent, { command, output }: CommandOutputData) => {
-      setMessages((prevMessages) => {
-        const lastMessage = prevMessages[prevMessages.length - 1];
+    const handleEditBlock = (_: IpcRendererEvent, { messageId, event, blockId, path, format, section, content }: EditBlockData) => {
+      const processingMessage = processingMessageRef.current;
+      if (!processingMessage || processingMessage.id !== messageId) {
+        return;
+      }
+
+      const editBlocks = processingMessage.editBlocks ?? [];
+      if (event === 'start') {
+        const editBlock: EditBlock = {
+          id: blockId,
+          path,
+          format: format ?? 'editblock',
+          search: '',
+          replace: '',
+          content: '',
+          textOffset: processingMessage.content.length,
+          finished: false,
+        };
+        processingMessage.editBlocks = [...editBlocks, editBlock];
+      } else {
+        processingMessage.editBlocks = editBlocks.map((editBlock) => {
+          if (editBlock.id !== blockId) {
+            return editBlock;
+          }
+          if (event === 'end') {
+            return { ...editBlock, finished: true, endOffset: processingMessage.content.length };
+          }
+          if (section === 'search') {
+            return { ...editBlock, search: editBlock.search + (content ?? '') };
+          } else if (section === 'replace') {
+            return { ...editBlock, replace: editBlock.replace + (content ?? '') };
+          }
+          return { ...editBlock, content: editBlock.content + (content ?? '') };
+        });
+      }
+      setMessages((prevMessages) => prevMessages.map((message) => (message.id === messageId ? processingMessage : message)));
+    };
 
-        if (lastMessage && isCommandOutputMessage(lastMessage) && lastMessage.command === command) {
-          const updatedLastMessage: CommandOutputMessage = {
-            ...lastMessage,
-            content: lastMessage.content + output,
+    const handleCommandOutput = (_: IpcRendererEvent, { commandId, command, output, finished, exitCode }: CommandOutputData) => {
+      setMessages((prevMessages) => {
+        const existingMessage = prevMessages.find((message) => message.id === commandId);
+
+        if (existingMessage && isCommandOutputMessage(existingMessage)) {
+          const updatedMessage: CommandOutputMessage = {
+            ...existingMessage,
+            content: existingMessage.content + output,
+            finished,
+            exitCode,
           };
-          return prevMessages.slice(0, -1).concat(updatedLastMessage);
+          return prevMessages.map((message) => (message.id === commandId ? updatedMessage : message));
         } else {
           const commandOutputMessage: CommandOutputMessage = {
-            id: uuidv4(),
+            id: commandId,
             type: 'command-output',
             command,
             content: output,
+            finished,
+            exitCode,
           };
           return prevMessages.filter((message) => !isLoadingMessage(message)).concat(commandOutputMessage);
         }
@@ -309,7 +353,9 @@ export const ProjectView = ({ project, isActive = false }: Props) => {
 
     const handleUpdateAutocompletion = (_: IpcRendererEvent, { allFiles, models, words }: AutocompletionData) => {
       setAllFiles(allFiles);
-      setAvailableModels(models);
+      if (models) {
+        setAvailableModels(models);
+      }
       setAutocompletionWords(words);
     };
 
@@ -367,6 +413,7 @@ export const ProjectView = ({ project, isActive = false }: Props) => {
     const commandOutputListenerId = window.api.addCommandOutputListener(project.baseDir, handleCommandOutput);
     const responseChunkListenerId = window.api.addResponseChunkListener(project.baseDir, handleResponseChunk);
     const responseCompletedListenerId = window.api.addResponseCompletedListener(project.baseDir, handleResponseCompleted);
+    const editBlockListenerId = window.api.addEditBlockListener(project.baseDir, handleEditBlock);
     const logListenerId = window.api.addLogListener(project.baseDir, handleLog);
     const tokensInfoListenerId = window.api.addTokensInfoListener(project.baseDir, handleTokensInfo);
     const questionListenerId = window.api.addAskQuestionListener(project.baseDir, handleQuestion);
@@ -381,6 +428,7 @@ export const ProjectView = ({ project, isActive = false }: Props) => {
       window.api.removeCommandOutputListener(commandOutputListenerId);
       window.api.removeResponseChunkListener(responseChunkListenerId);
       window.api.removeResponseCompletedListener(responseCompletedListenerId);
+      window.api.removeEditBlockListener(editBlockListenerId);
       window.api.removeLogListener(logListenerId);
       window.api.removeTokensInfoListener(tokensInfoListenerId);
       window.api.removeAskQuestionListener(questionListenerId);
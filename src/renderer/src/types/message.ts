@@ -1,4 +1,4 @@
-import { Mode, TokensInfoData, UsageReportData } from '@common/types';
+import { EditBlockFormat, Mode, TokensInfoData, UsageReportData } from '@common/types';
 
 export interface Message {
   id: string;
@@ -11,10 +11,23 @@ export interface UserMessage extends Message {
   mode?: Mode;
 }
 
+export interface EditBlock {
+  id: number;
+  path?: string;
+  format: EditBlockFormat;
+  search: string;
+  replace: string;
+  content: string; // whole file content or udiff hunks
+  textOffset: number; // length of the message content when the block started
+  endOffset?: number; // length of the message content when the block ended
+  finished: boolean;
+}
+
 export interface ResponseMessage extends Message {
   type: 'response';
   processing: boolean;
   usageReport?: UsageReportData;
+  editBlocks?: EditBlock[];
 }
 
 export interface ReflectedMessage extends Message {
@@ -34,6 +47,8 @@ export interface LoadingMessage extends Message {
 export interface CommandOutputMessage extends Message {
   type: 'command-output';
   command: string;
+  finished?: boolean;
+  exitCode?: number;
 }
 
 export interface TokensInfoMessage extends Message {